@@ -2,11 +2,26 @@ import importlib.metadata
 import re
 
 from .base import Config, config, undefined
-from .ciphers import Cipher, KeyFile, Keys
+from .ciphers import AEADKeys, Cipher, KeyFile, Keys
+from .daemon import SocketSource
 from .dburl import register as register_database
-from .exceptions import ConfigError, ConfigWarning, PolicyError
-from .policy import UserOnly, UserOrGroup
+from .diagnostics import Diagnostics
+from .exceptions import (
+    ConfigError,
+    ConfigWarning,
+    PolicyError,
+    SchemaError,
+    SourceUnavailable,
+)
+from .httpkv import HttpKVSource
+from .packed import PackedSource
+from .policy import StatPolicy, UserOnly, UserOrGroup
+from .refreshing import RefreshingSource
+from .schema import Field, Schema
+from .sealed import EncryptedEnvFile
 from .sources import EnvDir, EnvFile, HostEnv, SecretsDir
+from .sqlite import SqliteSource
+from .structured import JsonSource, TomlSource, YamlSource
 from .types import (
     CacheDict,
     CommaSeparated,
@@ -30,6 +45,7 @@ __all__ = [
     "config",
     "register_database",
     "undefined",
+    "AEADKeys",
     "CacheDict",
     "Cipher",
     "CommaSeparated",
@@ -39,18 +55,33 @@ __all__ = [
     "ConfigError",
     "ConfigWarning",
     "DatabaseDict",
+    "Diagnostics",
     "Duration",
+    "EncryptedEnvFile",
     "EnvDir",
     "EnvFile",
+    "Field",
     "HostEnv",
+    "HttpKVSource",
+    "JsonSource",
     "Keys",
     "KeyFile",
+    "PackedSource",
     "PolicyError",
     "Recipient",
     "Recipients",
+    "RefreshingSource",
+    "Schema",
+    "SchemaError",
     "SecretsDir",
+    "SocketSource",
+    "SourceUnavailable",
+    "SqliteSource",
+    "StatPolicy",
+    "TomlSource",
     "UserOnly",
     "UserOrGroup",
+    "YamlSource",
     "Secret",
     "Separated",
 ]
@@ -1,11 +1,18 @@
+import contextlib
+import contextvars
 import datetime
+import itertools
 import os
-import warnings
-from collections.abc import Callable, Mapping
+import threading
+from collections.abc import Callable, Iterable, Iterator, Mapping
 from typing import Any, NamedTuple, TypeVar, overload
 
+from . import resilience
 from .ciphers import DecryptError
-from .exceptions import ConfigError, ConfigWarning
+from .diagnostics import Diagnostics
+from .exceptions import ConfigError, SourceUnavailable
+from .manifest import Manifest
+from .snapshot import Snapshot
 from .sources import BaseSource, EnvDir, EnvFile, HostEnv, Source
 from .types import StrPath
 
@@ -35,6 +42,9 @@ class ConfigValue(NamedTuple):
     default: Any
     sensitive: bool
     ttl: int | None
+    cast: Callable | None = None
+    # The value as it appears in the source, before decrypting.
+    stored: Any = None
 
 
 class Undefined:
@@ -45,13 +55,51 @@ class Undefined:
 undefined = Undefined()
 
 
+class Override(BaseSource):
+    """
+    A layer of values set by `Config.override`, including those of any enclosing
+    layers, along with the values resolved while it was active.
+    """
+
+    def __init__(self, values: Mapping[str, Any], parent: "Override | None" = None):
+        self.values = values if parent is None else {**parent.values, **values}
+        self.parent = parent
+        self.defined: dict[str, ConfigValue] = {}
+
+    def __str__(self):
+        return "Override"
+
+    def __getitem__(self, key: str) -> Any:
+        return self.values[key]
+
+    def keys(self) -> Iterable[str]:
+        return list(self.values)
+
+    def decrypt(self, value: str, ttl: int | None = None) -> str:
+        # Overridden values are set in code, so are never encrypted.
+        return value
+
+    def resolved(self) -> dict[str, ConfigValue]:
+        defined = {} if self.parent is None else self.parent.resolved()
+        return {**defined, **self.defined}
+
+
 class Config:
+    # Both of these are copy-on-write: they are only ever replaced (under `_lock`),
+    # never mutated in place, so readers can use them without locking.
     _sources: list[BaseSource]
     _defined: dict[str, ConfigValue]
 
     def __init__(self, *sources: SourceTypes, **kwargs: Any):
+        self._lock = threading.Lock()
+        self._snapshot: Snapshot | None = None
         self._debug = False
         self._previous_debug = False
+        self.diagnostics = Diagnostics()
+        # The innermost `override` layer active in the current thread or task.
+        self._layer: contextvars.ContextVar[Override | None] = contextvars.ContextVar(
+            f"cconf_override_{id(self)}", default=None
+        )
         self.setup(*sources, **kwargs)
 
     def __enter__(self):
@@ -63,6 +111,11 @@ class Config:
     def setup(self, *sources: SourceTypes, **kwargs: Any):
         self._debug = kwargs.pop("debug", self._debug)
         self._previous_debug = self._debug
+        diagnostics = kwargs.pop("diagnostics", None)
+        if isinstance(diagnostics, Diagnostics):
+            self.diagnostics = diagnostics
+        elif diagnostics is not None:
+            self.diagnostics = Diagnostics(diagnostics)
         self.reset()
         for source in sources:
             if isinstance(source, BaseSource):
@@ -83,8 +136,9 @@ class Config:
         """
         Resets the list of checked sources and already-defined configs.
         """
-        self._sources = []
-        self._defined = {}
+        with self._lock:
+            self._sources = []
+            self._defined = {}
         return self
 
     def debug(self, value: bool = True):
@@ -96,7 +150,8 @@ class Config:
         """
         Adds a configuration source to the list of checked sources.
         """
-        self._sources.append(source)
+        with self._lock:
+            self._sources = [*self._sources, source]
         return self
 
     def file(self, path: StrPath, **kwargs: Any):
@@ -119,12 +174,108 @@ class Config:
         source = HostEnv(**kwargs) if environ is None else Source(environ, **kwargs)
         return self.source(source)
 
+    def snapshot(self, path: StrPath):
+        """
+        Reads values from a snapshot compiled by `cconf compile`, instead of from the
+        file-backed sources it was compiled from. The snapshot is ignored if it does not
+        exist, and is only used while those sources remain unchanged.
+        """
+        try:
+            self._snapshot = Snapshot.read(path)
+        except FileNotFoundError:
+            self._snapshot = None
+        except ConfigError as ce:
+            self._snapshot = None
+            self.diagnostics.record("snapshot", "", str(ce), stacklevel=2)
+        return self
+
+    def prefetch(self, path: StrPath):
+        """
+        Fetches the keys recorded for each source in a manifest written by
+        `cconf manifest`, from every source concurrently, so that resolving them later
+        doesn't wait on each source one key at a time. The manifest is ignored if it
+        does not exist.
+        """
+        try:
+            failed = Manifest.read(path).prefetch(self._sources)
+        except FileNotFoundError:
+            return self
+        except ConfigError as ce:
+            self.diagnostics.record("prefetch", "", str(ce), stacklevel=2)
+            return self
+        for source, ex in failed:
+            self.diagnostics.record(
+                "prefetch", "", f"{source}: prefetch failed: {ex}", source, stacklevel=2
+            )
+        return self
+
+    @contextlib.contextmanager
+    def deadline(self, seconds: float) -> Iterator["Config"]:
+        """
+        Limits how long lookups in the current thread or task may wait on remote
+        sources, in total, until the block exits (such as while importing a settings
+        module at startup). Once the deadline passes, remote sources are skipped, and
+        lookups fall through to the next source (or default) straight away.
+        """
+        with resilience.deadline(seconds):
+            yield self
+
+    @contextlib.contextmanager
+    def override(
+        self, values: Mapping[str, Any] | None = None, **kwargs: Any
+    ) -> Iterator["Config"]:
+        """
+        Overrides configuration values for the current thread or asyncio task, until
+        the block exits. Overridden values are used (and cast) in place of the values
+        from any source, and values resolved inside the block are not recorded in
+        `_defined`. Overrides may be nested.
+        """
+        layer = Override({**(values or {}), **kwargs}, self._layer.get())
+        token = self._layer.set(layer)
+        try:
+            yield self
+        finally:
+            self._layer.reset(token)
+
+    def _read(self, source: BaseSource, key: str, entries: Any) -> Any:
+        """
+        Returns the raw value of `key` from `source`, using `entries` (the snapshot's
+        entries for that source) when they know about `key`.
+        """
+        if entries is None or key not in entries:
+            return source[key]
+        raw = entries[key]
+        if raw is None:
+            raise KeyError(key)
+        return raw
+
+    def _snapshot_entries(self, sources: list[BaseSource]) -> Iterable[Any]:
+        snapshot = self._snapshot
+        entries = None if snapshot is None else snapshot.entries(sources)
+        return itertools.repeat(None) if entries is None else entries
+
     @property
     def defined(self):
         """
         Returns a dictionary of all known config names mapped to their cast values.
         """
-        return {k: v.value for k, v in self._defined.items()}
+        defined = self._defined
+        layer = self._layer.get()
+        if layer is not None:
+            defined = {**defined, **layer.resolved()}
+        return {k: v.value for k, v in defined.items()}
+
+    def _define(self, values: Mapping[str, ConfigValue]):
+        """
+        Records resolved config values by swapping in an updated copy of `_defined`, or
+        of the current override layer's values if there is one.
+        """
+        layer = self._layer.get()
+        with self._lock:
+            if layer is None:
+                self._defined = {**self._defined, **values}
+            else:
+                layer.defined = {**layer.defined, **values}
 
     # When default=None, the returned value may be None (any cast of None is None).
     @overload
@@ -171,58 +322,181 @@ class Config:
         sensitive: bool = False,
         ttl: int | datetime.timedelta | None = None,
     ) -> Any:
-        sources_checked: list[str] = []
         key = str(key)
         if isinstance(ttl, datetime.timedelta):
             ttl = int(ttl.total_seconds())
-        for source in self._sources:
-            sources_checked.append(str(source))
+        layer = self._layer.get()
+        if layer is not None and key in layer.values:
+            raw = layer.values[key]
+            value = self._perform_cast(raw, cast, key=key)
+            self._define(
+                {key: ConfigValue(raw, value, layer, default, sensitive, ttl, cast)}
+            )
+            return value
+        sources = self._sources
+        configval = self._resolve(sources, key, default, cast, sensitive, ttl)
+        if configval is not None:
+            self._define({key: configval})
+            return configval.value
+        checked = ", ".join(str(source) for source in sources)
+        if self._debug:
+            self.diagnostics.record(
+                "missing",
+                key,
+                f"`{key}` has no default and was not found in any of: {checked}",
+                stacklevel=2,
+            )
+            return default
+        raise KeyError(f"`{key}` not found in any of: {checked}")
+
+    def _resolve(
+        self,
+        sources: list[BaseSource],
+        key: str,
+        default: Any,
+        cast: Callable | None,
+        sensitive: bool,
+        ttl: int | None,
+        previous: ConfigValue | None = None,
+    ) -> ConfigValue | None:
+        """
+        Resolves `key` from `sources` (or its default), returning `None` if it has no
+        value. If the value in its source is unchanged from `previous`, `previous` is
+        returned as-is, without decrypting or casting it again.
+        """
+        for source, entries in zip(sources, self._snapshot_entries(sources)):
+            if source.remote and resilience.expired():
+                self.diagnostics.record(
+                    "unavailable",
+                    "",
+                    f"{source} skipped: deadline exceeded.",
+                    source,
+                    stacklevel=3,
+                )
+                continue
             try:
-                raw = source[key]
-                if sensitive:
-                    raw = source.decrypt(raw, ttl=ttl)
+                stored = self._read(source, key, entries)
+                if (
+                    previous is not None
+                    and previous.source is source
+                    and previous.stored == stored
+                ):
+                    return previous
+                raw = source.decrypt(stored, ttl=ttl) if sensitive else stored
                 value = self._perform_cast(raw, cast, key=key)
-                self._defined[key] = ConfigValue(
-                    raw, value, source, default, sensitive, ttl
+                return ConfigValue(
+                    raw, value, source, default, sensitive, ttl, cast, stored
                 )
-                return value
             except KeyError:
                 # Config name was not found in this source, move along.
                 continue
+            except SourceUnavailable as su:
+                # The source could not be reached at all, which is reported once for
+                # the source rather than for every key.
+                self.diagnostics.record(
+                    "unavailable", "", str(su), source, stacklevel=3
+                )
+                continue
             except ConfigError as ce:
                 # Config was found, but no keys were specified for a sensitive config.
-                warnings.warn(str(ce), ConfigWarning, stacklevel=2)
+                self.diagnostics.record("source", key, str(ce), source, stacklevel=3)
                 continue
             except DecryptError:
                 # Config was found, but not (or improperly) encrypted. Move along, but
-                # emit a warning.
-                warnings.warn(
+                # report it.
+                self.diagnostics.record(
+                    "decrypt",
+                    key,
                     f"`{key}` found in {source} but improperly encrypted (or expired).",
-                    ConfigWarning,
-                    stacklevel=2,
+                    source,
+                    stacklevel=3,
                 )
                 continue
-        if default is not undefined:
-            value = self._perform_cast(default, cast, key=key)
-            self._defined[key] = ConfigValue(
-                default, value, None, default, sensitive, ttl
+        if default is undefined:
+            return None
+        if sensitive and not self._debug:
+            self.diagnostics.record(
+                "sensitive-default",
+                key,
+                f"`{key}` is marked sensitive but using a default value.",
+                stacklevel=3,
             )
-            if sensitive and not self._debug:
-                warnings.warn(
-                    f"`{key}` is marked sensitive but using a default value.",
-                    ConfigWarning,
-                    stacklevel=2,
-                )
-            return value
-        checked = ", ".join(sources_checked)
-        if self._debug:
-            warnings.warn(
-                f"`{key}` has no default and was not found in any of: {checked}",
-                ConfigWarning,
-                stacklevel=2,
+        if previous is not None and previous.source is None:
+            return previous
+        value = self._perform_cast(default, cast, key=key)
+        return ConfigValue(default, value, None, default, sensitive, ttl, cast)
+
+    def reload(self) -> dict[str, tuple[Any, Any]]:
+        """
+        Re-reads every defined value from the sources, only decrypting and casting the
+        values that have changed, and swaps them all in at once. Returns the changes,
+        as a dictionary of keys to their old and new values (`undefined` if a key no
+        longer has a value).
+        """
+        sources = self._sources
+        for source in sources:
+            try:
+                source.reload()
+            except ConfigError as ce:
+                self.diagnostics.record("source", "", str(ce), source, stacklevel=2)
+        if self._snapshot is not None:
+            self._snapshot.recheck()
+        defined = self._defined
+        updated: dict[str, ConfigValue] = {}
+        removed: list[str] = []
+        changes: dict[str, tuple[Any, Any]] = {}
+        for key, previous in defined.items():
+            configval = self._resolve(
+                sources,
+                key,
+                previous.default,
+                previous.cast,
+                previous.sensitive,
+                previous.ttl,
+                previous,
             )
-            return default
-        raise KeyError(f"`{key}` not found in any of: {checked}")
+            if configval is previous:
+                continue
+            if configval is None:
+                removed.append(key)
+                changes[key] = (previous.value, undefined)
+            else:
+                updated[key] = configval
+                if configval.value != previous.value:
+                    changes[key] = (previous.value, configval.value)
+        with self._lock:
+            new_defined = {**self._defined, **updated}
+            for key in removed:
+                new_defined.pop(key, None)
+            self._defined = new_defined
+        return changes
+
+    def prefixed(
+        self,
+        prefix: str,
+        *,
+        cast: Callable | None = str,
+        sensitive: bool = False,
+        ttl: int | datetime.timedelta | None = None,
+    ) -> dict[str, Any]:
+        """
+        Returns a dictionary of every key starting with `prefix` (in any source), mapped
+        to its value. Each value is resolved (and cast) as if by `config(key)`, so the
+        usual source precedence applies.
+        """
+        keys: set[str] = set()
+        layer = self._layer.get()
+        if layer is not None:
+            keys.update(k for k in layer.values if k.startswith(prefix))
+        for source in self._sources:
+            try:
+                keys.update(source.index().prefixed(prefix))
+            except ConfigError as ce:
+                self.diagnostics.record("source", prefix, str(ce), source, stacklevel=2)
+        return {
+            key: self(key, cast=cast, sensitive=sensitive, ttl=ttl)
+            for key in sorted(keys)
+        }
 
     # None always casts to None.
     @overload
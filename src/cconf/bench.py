@@ -0,0 +1,120 @@
+import platform
+import time
+import tracemalloc
+from typing import TYPE_CHECKING, Any
+
+from .ciphers import DecryptError
+from .exceptions import ConfigError
+
+if TYPE_CHECKING:
+    from .base import Config
+
+PHASES = ("lookup", "decrypt", "cast")
+
+
+def percentile(timings: list[int], q: float) -> float:
+    """
+    Returns the `q`th percentile (nearest rank) of sorted `timings`, in microseconds.
+    """
+    if not timings:
+        return 0.0
+    index = min(len(timings) - 1, max(0, round(q / 100 * len(timings)) - 1))
+    return timings[index] / 1000
+
+
+def measure(config: "Config", source: Any, iterations: int) -> dict[str, list[int]]:
+    """
+    Times each phase of resolving every defined key from `source`, `iterations` times.
+    """
+    timings: dict[str, list[int]] = {phase: [] for phase in PHASES}
+    clock = time.perf_counter_ns
+    for key, configval in config._defined.items():
+        for _ in range(iterations):
+            start = clock()
+            try:
+                raw = source[key]
+            except (KeyError, ConfigError):
+                timings["lookup"].append(clock() - start)
+                continue
+            timings["lookup"].append(clock() - start)
+            if configval.sensitive:
+                start = clock()
+                try:
+                    raw = source.decrypt(raw, ttl=configval.ttl)
+                except (DecryptError, ConfigError):
+                    continue
+                finally:
+                    timings["decrypt"].append(clock() - start)
+            start = clock()
+            try:
+                config._perform_cast(raw, configval.cast, key=key)
+            except ValueError:
+                continue
+            finally:
+                timings["cast"].append(clock() - start)
+    return timings
+
+
+def allocations(config: "Config", source: Any) -> dict[str, dict[str, int]]:
+    """
+    Resolves every defined key from `source` once under `tracemalloc`, returning the
+    number of bytes allocated by each phase (net, and at peak).
+    """
+    totals = {phase: {"net_bytes": 0, "peak_bytes": 0} for phase in PHASES}
+
+    def track(phase: str, func: Any, *args: Any, **kwargs: Any) -> Any:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        try:
+            return func(*args, **kwargs)
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            totals[phase]["net_bytes"] += current - before
+            totals[phase]["peak_bytes"] = max(
+                totals[phase]["peak_bytes"], peak - before
+            )
+
+    tracemalloc.start()
+    try:
+        for key, configval in config._defined.items():
+            try:
+                raw = track("lookup", source.__getitem__, key)
+                if configval.sensitive:
+                    raw = track("decrypt", source.decrypt, raw, ttl=configval.ttl)
+                track("cast", config._perform_cast, raw, configval.cast, key=key)
+            except (KeyError, ConfigError, DecryptError, ValueError):
+                continue
+    finally:
+        tracemalloc.stop()
+    return totals
+
+
+def bench(config: "Config", iterations: int = 100) -> dict[str, Any]:
+    """
+    Re-resolves every key in `config._defined` against each of the config's sources,
+    and reports latency percentiles (in microseconds) and allocations for the lookup,
+    decrypt, and cast phases.
+    """
+    from . import __version__
+
+    results = []
+    for source in config._sources:
+        timings = measure(config, source, iterations)
+        allocated = allocations(config, source)
+        phases = {}
+        for phase in PHASES:
+            samples = sorted(timings[phase])
+            phases[phase] = {
+                "count": len(samples),
+                "p50_us": percentile(samples, 50),
+                "p99_us": percentile(samples, 99),
+                **allocated[phase],
+            }
+        results.append({"source": str(source), **phases})
+    return {
+        "cconf": __version__,
+        "python": platform.python_version(),
+        "iterations": iterations,
+        "keys": len(config._defined),
+        "sources": results,
+    }
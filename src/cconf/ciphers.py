@@ -1,12 +1,20 @@
 import base64
 import binascii
-from collections.abc import Iterable
+import hashlib
+import os
+import struct
+import threading
+import time
+from collections.abc import Callable, Iterable
 from typing import ClassVar, TextIO
 
+from cryptography.exceptions import InvalidTag
 from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
 from .exceptions import ConfigError
-from .policy import PolicyCallable, UserOnly, safe_open
+from .policy import PolicyCallable, StatPolicy, UserOnly, safe_open
+from .stamps import Stamp
 from .types import StrPath
 
 
@@ -14,20 +22,6 @@ class DecryptError(Exception):
     pass
 
 
-def read_keys(fileobj: TextIO) -> MultiFernet:
-    """
-    Reads Fernet keys from a file-like object, one per line. Returns a list of Fernet
-    objects.
-    """
-    fernets: list[Fernet] = []
-    for line in fileobj.readlines():
-        # TODO: skip commented out lines?
-        key = line.strip()
-        if key:
-            fernets.append(Fernet(key))
-    return MultiFernet(fernets)
-
-
 class Cipher:
     secure: ClassVar[bool]
 
@@ -56,30 +50,227 @@ class Keys(Cipher):
             raise DecryptError
 
 
+# Distinguishes AEAD keys from Fernet keys, which are otherwise formatted the same.
+AEAD_KEY_PREFIX = "aead:"
+# Version, key ID, and timestamp; authenticated (but not encrypted) with each value.
+AEAD_HEADER = struct.Struct(">B4sQ")
+AEAD_VERSION = 0x01
+AEAD_NONCE_SIZE = 12
+# How far in the future a token's timestamp may be, to allow for clock skew.
+AEAD_MAX_CLOCK_SKEW = 60
+
+
+class AEADKeys(Cipher):
+    """
+    An AES-256-GCM cipher for keys made by `cconf genkey --aead`. Each token records
+    the ID of the key that encrypted it, so decrypting picks the right key directly
+    instead of trying each in turn, and the time it was encrypted, for `ttl`. The first
+    key is used for encryption. Keys may be given with or without their `aead:` prefix.
+    """
+
+    secure = True
+
+    def __init__(self, keyiter: Iterable[str | bytes]):
+        self._keys: dict[bytes, AESGCM] = {}
+        self._current: tuple[bytes, AESGCM] | None = None
+        for k in keyiter:
+            if isinstance(k, bytes):
+                k = k.decode()
+            k = k.removeprefix(AEAD_KEY_PREFIX)
+            try:
+                key = base64.urlsafe_b64decode(k)
+            except binascii.Error:
+                raise ConfigError("AEAD keys must be urlsafe base64-encoded.")
+            if len(key) != 32:
+                raise ConfigError("AEAD keys must be 32 bytes.")
+            kid = self.key_id(key)
+            aead = self._keys.setdefault(kid, AESGCM(key))
+            if self._current is None:
+                self._current = (kid, aead)
+        if self._current is None:
+            raise ConfigError("No AEAD keys given.")
+
+    @staticmethod
+    def generate_key() -> str:
+        key = base64.urlsafe_b64encode(AESGCM.generate_key(256)).decode()
+        return AEAD_KEY_PREFIX + key
+
+    @staticmethod
+    def key_id(key: bytes) -> bytes:
+        return hashlib.blake2b(key, digest_size=4, person=b"cconf-kid").digest()
+
+    def encrypt(self, value: str) -> str:
+        assert self._current is not None
+        kid, aead = self._current
+        header = AEAD_HEADER.pack(AEAD_VERSION, kid, int(time.time()))
+        nonce = os.urandom(AEAD_NONCE_SIZE)
+        data = aead.encrypt(nonce, value.encode(), header)
+        return base64.urlsafe_b64encode(header + nonce + data).decode()
+
+    def decrypt(self, value: str, ttl: int | None = None) -> str:
+        try:
+            token = base64.urlsafe_b64decode(value)
+            version, kid, timestamp = AEAD_HEADER.unpack_from(token)
+        except (binascii.Error, ValueError, struct.error):
+            raise DecryptError
+        aead = self._keys.get(kid)
+        if version != AEAD_VERSION or aead is None:
+            raise DecryptError
+        now = int(time.time())
+        if timestamp > now + AEAD_MAX_CLOCK_SKEW:
+            raise DecryptError
+        if ttl is not None and timestamp + ttl < now:
+            raise DecryptError
+        start = AEAD_HEADER.size
+        nonce = token[start : start + AEAD_NONCE_SIZE]
+        try:
+            data = aead.decrypt(nonce, token[start + AEAD_NONCE_SIZE :], token[:start])
+        except (InvalidTag, ValueError):
+            raise DecryptError
+        return data.decode()
+
+
+def is_aead_key(key: str | bytes | Fernet) -> bool:
+    if isinstance(key, bytes):
+        return key.startswith(AEAD_KEY_PREFIX.encode())
+    return isinstance(key, str) and key.startswith(AEAD_KEY_PREFIX)
+
+
+def cipher_for(keyiter: Iterable[str | bytes | Fernet]) -> Cipher:
+    """
+    Returns an `AEADKeys` cipher if the given keys are AEAD keys (with an `aead:`
+    prefix), or a `Keys` cipher for Fernet keys.
+    """
+    keys = list(keyiter)
+    aead = [is_aead_key(k) for k in keys]
+    if any(aead):
+        if not all(aead):
+            raise ConfigError("AEAD and Fernet keys can't be used together.")
+        return AEADKeys(keys)  # type: ignore
+    return Keys(keys)
+
+
+def read_keys(fileobj: TextIO) -> Cipher | None:
+    """
+    Reads keys from a file-like object, one per line. Returns a cipher for them (see
+    `cipher_for`), or `None` if there are no keys.
+    """
+    # TODO: skip commented out lines?
+    keys = [key for key in (line.strip() for line in fileobj.readlines()) if key]
+    return cipher_for(keys) if keys else None
+
+
+class KeyRing:
+    """
+    The parsed keys of a single key file, shared by every `KeyFile` that points at it.
+    Reloads (atomically, from the reader's point of view) when the file changes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.info: os.stat_result | None = None
+        self.keys: Cipher | None = None
+        self._lock = threading.Lock()
+
+    def load(
+        self,
+        current: os.stat_result,
+        check: Callable[[os.stat_result], None],
+    ) -> tuple[os.stat_result, Cipher | None]:
+        """
+        Returns the stat result of the parsed file (taken from the open descriptor), and
+        its keys, re-reading the file if `current` shows it has changed. The file is
+        passed to `check` (which should raise if it fails a policy) before any keys are
+        read from it.
+        """
+        with self._lock:
+            loaded = None if self.info is None else Stamp.of(self.info)
+            if loaded is None or loaded != Stamp.of(current) or loaded.racy:
+                with safe_open(self.path) as fileobj:
+                    info = os.fstat(fileobj.fileno())
+                    check(info)
+                    keys = read_keys(fileobj)
+                self.info, self.keys = info, keys
+            else:
+                # Same contents, but pick up any change in ownership or permissions.
+                check(current)
+                self.info = current
+            assert self.info is not None
+            return self.info, self.keys
+
+
+_rings: dict[tuple[str, int, int], KeyRing] = {}
+_rings_lock = threading.Lock()
+
+
+def key_ring(filename: StrPath) -> tuple[KeyRing, os.stat_result]:
+    """
+    Returns the process-wide `KeyRing` for a key file (keyed by its resolved path and
+    inode, so replacing the file starts a new ring), along with its current stat.
+    """
+    path = os.path.realpath(filename)
+    info = os.stat(path)
+    key = (path, info.st_dev, info.st_ino)
+    with _rings_lock:
+        ring = _rings.get(key)
+        if ring is None:
+            # Forget rings for files that have since been replaced at this path.
+            for old in [k for k in _rings if k[0] == path]:
+                del _rings[old]
+            ring = _rings[key] = KeyRing(path)
+    return ring, info
+
+
 class KeyFile(Cipher):
     secure = True
 
+    # How often (in seconds) to check whether the key file has changed.
+    check_interval: float = 1.0
+
     def __init__(self, filename: StrPath, policy: PolicyCallable | None = UserOnly):
         self._filename = filename
         self._policy = policy
-        self._keys = None
+        self._keys: Cipher | None = None
+        self._seen: tuple[int, ...] | None = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return "{}({})".format(self.__class__.__name__, self._filename)
+
+    def _check(self, info: os.stat_result):
+        # The ring may have been loaded through another KeyFile, so this KeyFile's
+        # policy is checked against every new version it sees.
+        seen = (*Stamp.of(info), info.st_mode, info.st_uid)
+        if seen != self._seen:
+            if isinstance(self._policy, StatPolicy):
+                self._policy(self._filename, info)
+            elif self._policy:
+                self._policy(self._filename)
+            self._seen = seen
 
-    def _load_keys(self) -> MultiFernet:
-        if self._keys is None:
-            with safe_open(self._filename, policy=self._policy) as fileobj:
-                self._keys = read_keys(fileobj)
-        if not self._keys:
+    def _load_keys(self) -> Cipher:
+        keys = self._keys
+        if keys is None or time.monotonic() - self._checked >= self.check_interval:
+            with self._lock:
+                if (
+                    self._keys is None
+                    or time.monotonic() - self._checked >= self.check_interval
+                ):
+                    ring, current = key_ring(self._filename)
+                    _, keys = ring.load(current, self._check)
+                    self._keys = keys
+                    self._checked = time.monotonic()
+                keys = self._keys
+        if not keys:
             raise ConfigError(f"No keys found for: {self}")
-        return self._keys
+        return keys
 
     def encrypt(self, value: str) -> str:
-        return self._load_keys().encrypt(value.encode()).decode()
+        return self._load_keys().encrypt(value)
 
     def decrypt(self, value: str, ttl: int | None = None) -> str:
-        try:
-            return self._load_keys().decrypt(value.encode(), ttl=ttl).decode()
-        except InvalidToken:
-            raise DecryptError
+        return self._load_keys().decrypt(value, ttl=ttl)
 
 
 class Base64(Cipher):
@@ -3,7 +3,16 @@ import importlib
 import json
 import sys
 
-from .ciphers import KeyFile
+from . import sealed
+from .ciphers import AEADKeys, KeyFile
+from .daemon import ConfigServer
+from .exceptions import ConfigError
+from .manifest import Manifest
+from .packed import write_packed
+from .policy import safe_write
+from .snapshot import Snapshot
+from .sources import read_entries
+from .sqlite import write_sqlite
 
 
 def log(msg, *args, file=sys.stdout):
@@ -34,6 +43,7 @@ def setup_parser(parser):
     subs.add_parser("check")
     genkey = subs.add_parser("genkey")
     genkey.add_argument("-o", "--output", default=None)
+    genkey.add_argument("--aead", action="store_true")
     encrypt = subs.add_parser("encrypt")
     encrypt.add_argument("--keyfile", default=None)
     encrypt.add_argument("value", nargs=1)
@@ -43,6 +53,30 @@ def setup_parser(parser):
     k8s.add_argument("-n", "--namespace", default=None)
     k8s.add_argument("-y", "--yaml", action="store_true")
     k8s.add_argument("name", nargs="?", default="cconf")
+    compile = subs.add_parser("compile")
+    compile.add_argument("-o", "--output", required=True)
+    manifest = subs.add_parser("manifest")
+    manifest.add_argument("-o", "--output", required=True)
+    pack = subs.add_parser("pack")
+    pack.add_argument("-o", "--output", required=True)
+    pack.add_argument("env_file", nargs="+")
+    sqlite = subs.add_parser("sqlite")
+    sqlite.add_argument("-o", "--output", required=True)
+    sqlite.add_argument("-t", "--table", default="config")
+    sqlite.add_argument("env_file", nargs="*")
+    seal = subs.add_parser("seal")
+    seal.add_argument("-k", "--keyfile", required=True)
+    seal.add_argument("-o", "--output", default=None)
+    seal.add_argument("env_file", nargs=1)
+    unseal = subs.add_parser("unseal")
+    unseal.add_argument("-k", "--keyfile", required=True)
+    unseal.add_argument("-o", "--output", default=None)
+    unseal.add_argument("sealed_file", nargs=1)
+    serve = subs.add_parser("serve")
+    serve.add_argument("-s", "--socket", required=True)
+    serve.add_argument("--allow-uid", type=int, action="append", dest="allow_uids")
+    bench = subs.add_parser("bench")
+    bench.add_argument("-n", "--iterations", type=int, default=100)
 
 
 def check(config, **options):
@@ -55,17 +89,26 @@ def check(config, **options):
         log(f"{source}")
         for key, value in source_vars[source]:
             log(f"    {key}\n        {repr(value)}")
+    issues = config.diagnostics.report()
+    if issues:
+        log("Issues")
+        for issue in issues:
+            log("    [{}] {} ({}x)", issue["kind"], issue["message"], issue["count"])
 
 
 def genkey(config, **options):
     from cryptography.fernet import Fernet
 
+    if options.get("aead"):
+        key = AEADKeys.generate_key()
+    else:
+        key = Fernet.generate_key().decode()
     filename = options.get("output")
     if filename:
         with open(filename, "w") as f:
-            f.write(Fernet.generate_key().decode())
+            f.write(key)
     else:
-        log(Fernet.generate_key().decode())
+        log(key)
 
 
 def encrypt(config, **options):
@@ -76,7 +119,10 @@ def encrypt(config, **options):
     else:
         for source in config._sources:
             log(source)
-            log("    {}", source.encrypt(options["value"][0]))
+            try:
+                log("    {}", source.encrypt(options["value"][0]))
+            except ConfigError as ce:
+                log("    {}", ce)
 
 
 def dump(config, **options):
@@ -150,6 +196,85 @@ def k8s(config, **options):
         log(json.dumps(objects, indent=4, default=lambda obj: ""))
 
 
+def compile(config, **options):
+    snapshot = Snapshot.compile(config)
+    snapshot.write(options["output"])
+    if not options.get("quiet"):
+        log("Compiled {} value(s) to {}", len(snapshot), options["output"])
+
+
+def manifest(config, **options):
+    manifest = Manifest.record(config)
+    manifest.write(options["output"])
+    if not options.get("quiet"):
+        log("Recorded {} key(s) to {}", len(manifest), options["output"])
+
+
+def pack(config, **options):
+    entries = {}
+    # Later files override entries from earlier ones.
+    for filename in options["env_file"]:
+        with open(filename) as f:
+            entries.update(read_entries(f))
+    write_packed(options["output"], entries)
+    if not options.get("quiet"):
+        log("Packed {} value(s) to {}", len(entries), options["output"])
+
+
+def sqlite(config, **options):
+    entries = {}
+    if options["env_file"]:
+        # Later files override entries from earlier ones.
+        for filename in options["env_file"]:
+            with open(filename) as f:
+                entries.update(read_entries(f))
+    else:
+        # Export values as they appear in their sources, so sensitive values stay
+        # encrypted. Values using their defaults are left out.
+        for key in sorted(config._defined):
+            configval = config._defined[key]
+            if configval.source is not None:
+                entries[key] = str(configval.source[key])
+    write_sqlite(options["output"], entries, table=options["table"])
+    if not options.get("quiet"):
+        log("Wrote {} value(s) to {}", len(entries), options["output"])
+
+
+def seal(config, **options):
+    with open(options["env_file"][0]) as f:
+        data = sealed.seal(f.read(), KeyFile(options["keyfile"], policy=None))
+    if options.get("output"):
+        safe_write(options["output"], data.encode())
+    else:
+        log(data.rstrip("\n"))
+
+
+def unseal(config, **options):
+    with open(options["sealed_file"][0]) as f:
+        text, _ = sealed.unseal(f.read(), KeyFile(options["keyfile"], policy=None))
+    if options.get("output"):
+        safe_write(options["output"], text.encode())
+    else:
+        log(text.rstrip("\n"))
+
+
+def serve(config, **options):
+    server = ConfigServer(options["socket"], config, options.get("allow_uids"))
+    if not options.get("quiet"):
+        log("Serving {} value(s) on {}", len(config._defined), options["socket"])
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def bench(config, **options):
+    from .bench import bench
+
+    log(json.dumps(bench(config, iterations=options["iterations"]), indent=4))
+
+
 def execute(**options):
     try:
         config_module = importlib.import_module(options["config_module"])
@@ -169,6 +294,22 @@ def execute(**options):
         dump(config, **options)
     elif action == "k8s":
         k8s(config, **options)
+    elif action == "compile":
+        compile(config, **options)
+    elif action == "manifest":
+        manifest(config, **options)
+    elif action == "pack":
+        pack(config, **options)
+    elif action == "sqlite":
+        sqlite(config, **options)
+    elif action == "seal":
+        seal(config, **options)
+    elif action == "unseal":
+        unseal(config, **options)
+    elif action == "serve":
+        serve(config, **options)
+    elif action == "bench":
+        bench(config, **options)
 
 
 def main(*args):
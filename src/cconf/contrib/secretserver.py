@@ -1,19 +1,49 @@
+import concurrent.futures
+import json
+import threading
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Union
 
+import requests
 from delinea.secrets.server import (
     AccessTokenAuthorizer,
     DomainPasswordGrantAuthorizer,
     PasswordGrantAuthorizer,
     SecretServer,
+    SecretServerClientError,
     SecretServerError,
+    SecretServerServiceError,
 )
 
+from cconf import resilience
 from cconf.exceptions import ConfigError
+from cconf.resilience import Backoff, CircuitBreaker
 from cconf.sources import BaseSource
 
+# Errors that may succeed if retried: server errors, connection failures, and timeouts.
+# Client errors (such as a missing secret) are not retried.
+RETRY_ON = (SecretServerServiceError, requests.RequestException, TimeoutError)
+
 
 class SecretServerSource(BaseSource):
+    """
+    A configuration source that reads secrets from Delinea Secret Server. Each key is
+    the name (in the `prefix` folder) or ID of a secret, whose first password field (or
+    `field`) is returned.
+
+    With a `separator` (such as `"__"`), every field of a secret is also available as
+    its own key, such as `DB__username` and `DB__password`. Each secret is then fetched
+    once, and cached until the source is reloaded.
+
+    Each request is given up on after `timeout` seconds (though it may carry on in the
+    background), and failed requests are retried with `backoff`. After repeated
+    failures, `breaker` refuses requests for a while, so lookups fail (or fall through
+    to the next source) at once.
+    """
+
+    remote = True
+
     def __init__(
         self,
         ss: Union[SecretServer, str],
@@ -24,6 +54,10 @@ class SecretServerSource(BaseSource):
         domain: Optional[str] = None,
         prefix: Optional[list] = None,
         field: Optional[str] = None,
+        separator: Optional[str] = None,
+        timeout: Optional[float] = 10.0,
+        backoff: Optional[Backoff] = Backoff(),
+        breaker: Optional[CircuitBreaker] = None,
         verify: bool = False,
     ):
         if isinstance(ss, SecretServer):
@@ -49,6 +83,16 @@ class SecretServerSource(BaseSource):
             self.ss = SecretServer(ss, auth)
         self.prefix = prefix or []
         self.field = field
+        self.separator = separator
+        # Fetched secrets. Without a `separator`, only prefetched secrets are kept, each
+        # used by the next lookup of its key.
+        self._secrets = {}
+        self._fetching = {}
+        self._lock = threading.Lock()
+        self.timeout = timeout
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self._executor = None
         if verify:
             try:
                 self.ss.search_secrets()
@@ -64,20 +108,156 @@ class SecretServerSource(BaseSource):
             path = "\\".join([*self.prefix, name_or_id])
             return self.ss.get_secret_by_path(path)
 
-    def __getitem__(self, key):
+    def _request(self, name_or_id):
+        """
+        Fetches a secret with the configured timeout, retries, and circuit breaker,
+        raising `SourceUnavailable` if Secret Server can't be reached.
+        """
+
+        def attempt():
+            timeout = self.timeout
+            left = resilience.remaining()
+            if left is not None:
+                left = max(left, 0)
+                timeout = left if timeout is None else min(timeout, left)
+            if timeout is None:
+                return self._get_secret(name_or_id)
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        8, thread_name_prefix="cconf-secretserver"
+                    )
+                executor = self._executor
+            try:
+                return executor.submit(self._get_secret, name_or_id).result(timeout)
+            except concurrent.futures.TimeoutError:
+                raise TimeoutError(f"timed out after {timeout:g}s")
+
+        return resilience.call(
+            attempt,
+            retry_on=RETRY_ON,
+            backoff=self.backoff,
+            breaker=self.breaker,
+            name=str(self),
+        )
+
+    def _lookup(self, name):
+        """
+        Requests the secret `name`, returning (rather than raising) the
+        `SecretServerClientError` if it doesn't exist or can't be read, so that the
+        result can be cached either way.
+        """
         try:
-            secret = self._get_secret(key)
-        except SecretServerError as ex:
-            raise ConfigError("{}: {}".format(key, ex.message))
+            return self._request(name)
+        except SecretServerClientError as ex:
+            return ex
+
+    def _fetch(self, name):
+        """
+        Returns the secret `name` from the cache, or fetches it. Concurrent fetches of
+        the same secret are combined into one.
+        """
+        with self._lock:
+            if self.separator:
+                secret = self._secrets.get(name)
+            else:
+                secret = self._secrets.pop(name, None)
+            if secret is None:
+                fetching = self._fetching.setdefault(name, threading.Lock())
+        if secret is None:
+            with fetching:
+                secret = self._secrets.get(name) if self.separator else None
+                if secret is None:
+                    try:
+                        secret = self._lookup(name)
+                    except SecretServerError as ex:
+                        raise ConfigError("{}: {}".format(name, ex.message))
+                    else:
+                        if self.separator:
+                            with self._lock:
+                                self._secrets[name] = secret
+                    finally:
+                        with self._lock:
+                            self._fetching.pop(name, None)
+        if isinstance(secret, SecretServerClientError):
+            raise ConfigError("{}: {}".format(name, secret.message))
+        return secret
+
+    def __getitem__(self, key):
+        name, field = key, self.field
+        if self.separator and self.separator in key:
+            name, field = key.split(self.separator, 1)
+        secret = self._fetch(name)
         for item in secret["items"]:
-            if item["isPassword"] and not self.field:
+            if item["isPassword"] and not field:
                 # If field is not specified, return the first password value.
                 return item["itemValue"]
-            elif self.field and item["fieldName"] == self.field:
+            elif field and field in (item["fieldName"], item.get("slug")):
                 # Otherwise return the value of the specified field.
                 return item["itemValue"]
         raise KeyError(key)
 
+    def keys(self):
+        """
+        Lists the names of the secrets in the `prefix` folder (or every secret the user
+        can see, if there is no prefix).
+        """
+        try:
+            params = {}
+            if self.prefix:
+                folder = self.ss.get_folder_by_path("\\".join(self.prefix))
+                params["filter.folderId"] = folder["id"]
+            names = []
+            while True:
+                page = json.loads(
+                    self.ss.search_secrets({**params, "skip": len(names), "take": 500})
+                )
+                names.extend(record["name"] for record in page["records"])
+                if not page.get("hasNext") or not page["records"]:
+                    return names
+        except SecretServerError as ex:
+            raise ConfigError("SecretServerError: {}".format(ex.message))
+
+    def prefetch(self, keys, max_workers=8):
+        """
+        Fetches the secrets for `keys` concurrently. Secrets that don't exist (or can't
+        be read) are cached as such, so looking them up doesn't request them again.
+        Secrets that can't be fetched for any other reason are skipped, and fetched
+        (and reported) again when they are looked up.
+        """
+        if self.separator:
+            keys = list(dict.fromkeys(key.split(self.separator, 1)[0] for key in keys))
+        else:
+            keys = list(keys)
+        if not keys:
+            return
+
+        def fetch(key):
+            try:
+                return self._lookup(key)
+            except (SecretServerError, ConfigError):
+                return None
+
+        with ThreadPoolExecutor(min(max_workers, len(keys))) as executor:
+            secrets = list(executor.map(fetch, keys))
+        with self._lock:
+            for key, secret in zip(keys, secrets):
+                if secret is not None:
+                    self._secrets[key] = secret
+
+    def reload(self):
+        with self._lock:
+            self._secrets = {}
+
+    def close(self):
+        """
+        Stops the threads used for requests, without waiting for any that timed out.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
     def decrypt(self, value, ttl=None):
         # Secrets come out of SS unencrypted.
         return value
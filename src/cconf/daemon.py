@@ -0,0 +1,364 @@
+import os
+import socket
+import socketserver
+import stat
+import struct
+import sys
+import threading
+import warnings
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, Any
+
+from .ciphers import DecryptError
+from .exceptions import ConfigError, ConfigWarning, PolicyError
+from .sources import BaseSource
+from .types import StrPath
+
+if TYPE_CHECKING:
+    from .base import Config
+
+# Every request and response is a frame: an opcode (or status), then the length of the
+# payload that follows.
+FRAME = struct.Struct(">BI")
+LENGTH = struct.Struct(">I")
+TTL = struct.Struct(">q")
+
+# Requests.
+OP_ALL = 1  # Every value the daemon's config has resolved.
+OP_GET = 2  # The raw value of a single key.
+OP_DECRYPT = 3  # Decrypt a value, with the keys of the source it was read from.
+
+# Responses.
+OK = 0
+NOT_FOUND = 1
+DECRYPT_FAILED = 2
+ERROR = 3
+
+# Flags for each value in an OP_ALL response.
+SENSITIVE = 1
+
+MAX_PAYLOAD = 64 * 1024 * 1024
+
+
+def pack_strings(*values: str) -> bytes:
+    parts = []
+    for value in values:
+        data = value.encode()
+        parts.append(LENGTH.pack(len(data)) + data)
+    return b"".join(parts)
+
+
+def unpack_strings(data: bytes, offset: int, count: int) -> tuple[list[str], int]:
+    """
+    Reads `count` length-prefixed strings from `data`, returning them along with the
+    offset just past the last one.
+    """
+    values = []
+    for _ in range(count):
+        (size,) = LENGTH.unpack_from(data, offset)
+        offset += LENGTH.size
+        values.append(data[offset : offset + size].decode())
+        offset += size
+    return values, offset
+
+
+def recv_exactly(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError("Connection closed.")
+        data += chunk
+    return bytes(data)
+
+
+def recv_frame(sock: socket.socket) -> tuple[int, bytes]:
+    code, size = FRAME.unpack(recv_exactly(sock, FRAME.size))
+    if size > MAX_PAYLOAD:
+        raise ValueError(f"Frame too large ({size} bytes).")
+    return code, recv_exactly(sock, size)
+
+
+def peer_uid(sock: socket.socket) -> int | None:
+    """
+    Returns the UID of the process on the other end of a Unix socket, or `None` if the
+    platform can't tell.
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = sock.getsockopt(
+        socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+    )
+    _pid, uid, _gid = struct.unpack("3i", creds)
+    return uid
+
+
+def check_peer(sock: socket.socket, trusted_uids: Iterable[int]):
+    uid = peer_uid(sock)
+    if uid is None:
+        warnings.warn(
+            "Peer credentials are not available on this platform; relying on socket "
+            "file permissions.",
+            ConfigWarning,
+        )
+    elif uid not in trusted_uids:
+        raise PolicyError(f"Untrusted peer UID: {uid}")
+
+
+class ConfigHandler(socketserver.BaseRequestHandler):
+    server: "ConfigServer"
+
+    def setup(self):
+        check_peer(self.request, self.server.trusted_uids)
+
+    def handle(self):
+        while True:
+            try:
+                op, payload = recv_frame(self.request)
+            except (EOFError, ValueError, OSError):
+                return
+            try:
+                status, body = self.server.respond(op, payload)
+            except Exception as ex:
+                status, body = ERROR, str(ex).encode()
+            self.request.sendall(FRAME.pack(status, len(body)) + body)
+
+
+class ConfigServer(socketserver.ThreadingUnixStreamServer):
+    """
+    Answers lookups for a `Config` over a Unix socket (created readable and writable
+    only by the current user), so key files are read and values decrypted in this
+    process only. Connections from users other than `trusted_uids` (by default, the
+    current user) are refused.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        path: StrPath,
+        config: "Config",
+        trusted_uids: Iterable[int] | None = None,
+    ):
+        self.config = config
+        self.trusted_uids = set(trusted_uids or (os.getuid(),))
+        # Replace a socket left behind by a previous daemon, but nothing else.
+        try:
+            if stat.S_ISSOCK(os.lstat(path).st_mode):
+                os.unlink(path)
+        except FileNotFoundError:
+            pass
+        umask = os.umask(0o177)
+        try:
+            super().__init__(os.fspath(path), ConfigHandler)
+        finally:
+            os.umask(umask)
+
+    def handle_error(self, request: Any, client_address: Any):
+        # Refused peers are expected; anything else is reported as usual.
+        if not isinstance(sys.exc_info()[1], PolicyError):
+            super().handle_error(request, client_address)
+
+    def respond(self, op: int, payload: bytes) -> tuple[int, bytes]:
+        if op == OP_ALL:
+            return OK, self.pack_all()
+        if op == OP_GET:
+            try:
+                return OK, str(self.lookup(payload.decode())[1]).encode()
+            except KeyError:
+                return NOT_FOUND, b""
+        if op == OP_DECRYPT:
+            (ttl,) = TTL.unpack_from(payload)
+            (key, value), _ = unpack_strings(payload, TTL.size, 2)
+            try:
+                source, raw = self.lookup(key)
+            except KeyError:
+                return NOT_FOUND, b""
+            # Only values this daemon served are decrypted, with the keys of the source
+            # they came from (just as `Config` would).
+            if str(raw) != value:
+                return DECRYPT_FAILED, b""
+            try:
+                return OK, source.decrypt(value, ttl=None if ttl < 0 else ttl).encode()
+            except (DecryptError, ConfigError):
+                return DECRYPT_FAILED, b""
+        return ERROR, f"Unknown request: {op}".encode()
+
+    def lookup(self, key: str) -> tuple[BaseSource, Any]:
+        for source in self.config._sources:
+            try:
+                return source, source[key]
+            except (KeyError, ConfigError):
+                continue
+        raise KeyError(key)
+
+    def pack_all(self) -> bytes:
+        """
+        Packs every value the config has resolved from a source (not defaults). Values
+        resolved as sensitive are sent as they appear in the source, along with their
+        decrypted value.
+        """
+        defined = self.config._defined
+        parts = []
+        count = 0
+        for key, configval in defined.items():
+            if configval.source is None:
+                continue
+            if configval.sensitive:
+                try:
+                    token = str(configval.source[key])
+                except (KeyError, ConfigError):
+                    continue
+                parts.append(
+                    bytes([SENSITIVE]) + pack_strings(key, token, str(configval.raw))
+                )
+            else:
+                parts.append(bytes([0]) + pack_strings(key, str(configval.raw)))
+            count += 1
+        return LENGTH.pack(count) + b"".join(parts)
+
+
+class SocketSource(BaseSource):
+    """
+    A configuration source that reads from a `cconf serve` daemon over a Unix socket.
+    Every value the daemon has resolved is fetched in a single round-trip on first use.
+    Other keys are looked up individually, and several lookups may be pipelined over
+    one round-trip with `get_many`.
+
+    Sensitive values are decrypted by the daemon, so this process never needs the keys.
+    The daemon must be running as one of `trusted_uids` (by default, the current user
+    or root).
+    """
+
+    def __init__(
+        self,
+        path: StrPath,
+        *,
+        trusted_uids: Iterable[int] | None = None,
+        timeout: float = 5.0,
+    ):
+        self._path = path
+        self._trusted_uids = set(trusted_uids or (os.getuid(), 0))
+        self._timeout = timeout
+        self._sock: socket.socket | None = None
+        self._lock = threading.Lock()
+        self._values: dict[str, str] | None = None
+        # Raw values served by the daemon, mapped to their keys (so they can be sent
+        # back to be decrypted), and to their decrypted values, if already known.
+        self._tokens: dict[str, str] = {}
+        self._plain: dict[str, str] = {}
+
+    def __str__(self):
+        return "{}({})".format(self.__class__.__name__, self._path)
+
+    def _exchange(self, data: bytes, count: int) -> list[tuple[int, bytes]]:
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self._timeout)
+            try:
+                sock.connect(os.fspath(self._path))
+                check_peer(sock, self._trusted_uids)
+            except BaseException:
+                sock.close()
+                raise
+            self._sock = sock
+        self._sock.sendall(data)
+        return [recv_frame(self._sock) for _ in range(count)]
+
+    def _disconnect(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def _call(self, requests: list[tuple[int, bytes]]) -> list[tuple[int, bytes]]:
+        """
+        Sends every request at once, then reads each response in turn.
+        """
+        data = b"".join(FRAME.pack(op, len(body)) + body for op, body in requests)
+        with self._lock:
+            reused = self._sock is not None
+            try:
+                try:
+                    return self._exchange(data, len(requests))
+                except (OSError, EOFError, ValueError):
+                    self._disconnect()
+                    if not reused:
+                        raise
+                    # The connection may have been closed by a restarted daemon.
+                    return self._exchange(data, len(requests))
+            except (OSError, EOFError, ValueError, PolicyError) as ex:
+                self._disconnect()
+                raise ConfigError(f"{self}: {ex}")
+
+    def _load(self) -> dict[str, str]:
+        values = self._values
+        if values is None:
+            [(status, payload)] = self._call([(OP_ALL, b"")])
+            if status != OK:
+                raise ConfigError(f"{self}: {payload.decode()}")
+            (count,) = LENGTH.unpack_from(payload)
+            offset = LENGTH.size
+            values = {}
+            for _ in range(count):
+                flags = payload[offset]
+                if flags & SENSITIVE:
+                    (key, token, plain), offset = unpack_strings(payload, offset + 1, 3)
+                    self._plain[token] = plain
+                else:
+                    (key, token), offset = unpack_strings(payload, offset + 1, 2)
+                values[key] = token
+                self._tokens[token] = key
+            self._values = values
+        return values
+
+    def __getitem__(self, key: str) -> str:
+        values = self._load()
+        if key in values:
+            return values[key]
+        return self.get_many([key])[key]
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, str]:
+        """
+        Looks up several keys in a single round-trip, returning the values found.
+        """
+        keys = list(keys)
+        found = {}
+        for key, (status, payload) in zip(
+            keys, self._call([(OP_GET, key.encode()) for key in keys])
+        ):
+            if status == OK:
+                found[key] = payload.decode()
+                self._tokens[found[key]] = key
+            elif status != NOT_FOUND:
+                raise ConfigError(f"{self}: {payload.decode()}")
+        return found
+
+    def keys(self) -> Iterable[str]:
+        return list(self._load())
+
+    def reload(self):
+        self._values = None
+
+    def prefetch(self, keys: Iterable[str]):
+        values = self._load()
+        missing = [key for key in keys if key not in values]
+        if missing:
+            self._values = {**values, **self.get_many(missing)}
+
+    def decrypt(self, value: str, ttl: int | None = None) -> str:
+        if ttl is None and value in self._plain:
+            return self._plain[value]
+        key = self._tokens.get(value)
+        if key is None:
+            raise DecryptError
+        body = TTL.pack(-1 if ttl is None else ttl) + pack_strings(key, value)
+        [(status, payload)] = self._call([(OP_DECRYPT, body)])
+        if status == OK:
+            return payload.decode()
+        if status in (NOT_FOUND, DECRYPT_FAILED):
+            raise DecryptError
+        raise ConfigError(f"{self}: {payload.decode()}")
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
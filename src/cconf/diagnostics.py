@@ -0,0 +1,63 @@
+import threading
+import warnings
+from typing import Any, NamedTuple
+
+from .exceptions import ConfigError, ConfigWarning
+
+ACTIONS = ("raise", "warn", "collect")
+
+
+class Issue(NamedTuple):
+    # One of "missing", "decrypt", "sensitive-default", "source", "unavailable",
+    # "snapshot", "prefetch", or "schema".
+    kind: str
+    key: str
+    source: str | None
+    message: str
+
+
+class Diagnostics:
+    """
+    Records each distinct issue a `Config` runs into, and how many times it occurred.
+    Depending on `action`, issues are also raised as a `ConfigError` ("raise"),
+    emitted as a `ConfigWarning` the first time they occur ("warn"), or only recorded
+    ("collect").
+    """
+
+    def __init__(self, action: str = "warn"):
+        if action not in ACTIONS:
+            raise ConfigError(f"Unknown diagnostics action: `{action}`")
+        self.action = action
+        self._counts: dict[Issue, int] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        kind: str,
+        key: str,
+        message: str,
+        source: Any = None,
+        stacklevel: int = 1,
+    ):
+        issue = Issue(kind, key, None if source is None else str(source), message)
+        with self._lock:
+            count = self._counts.get(issue, 0)
+            self._counts[issue] = count + 1
+        if self.action == "raise":
+            raise ConfigError(message)
+        if self.action == "warn" and not count:
+            warnings.warn(message, ConfigWarning, stacklevel=stacklevel + 1)
+
+    def report(self) -> list[dict[str, Any]]:
+        """
+        Returns every recorded issue (most frequent first) along with its count.
+        """
+        counts = sorted(self._counts.items(), key=lambda item: -item[1])
+        return [{**issue._asdict(), "count": count} for issue, count in counts]
+
+    def clear(self):
+        with self._lock:
+            self._counts = {}
+
+    def __len__(self):
+        return len(self._counts)
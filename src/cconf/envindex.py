@@ -0,0 +1,214 @@
+import mmap
+import os
+import re
+import struct
+from collections.abc import Iterator, Mapping
+from typing import IO, Any
+
+from .packed import SLOT, key_hash
+from .policy import PolicyCallable, safe_open, safe_write
+from .stamps import Stamp
+from .types import StrPath
+
+MAGIC = b"CCONFIDX"
+VERSION = 2
+
+# Magic, format version, the stamp of the indexed file (device, inode, size, mtime),
+# and the number of index slots.
+HEADER = struct.Struct("<8sIQQQqI")
+# Slots are laid out as in packed files, but with offsets into the indexed file. Key
+# offsets are stored plus one, so that zero marks an empty slot.
+
+# The ASCII characters `str.strip` treats as whitespace.
+WHITESPACE = b" \t\n\r\v\f\x1c\x1d\x1e\x1f"
+QUOTES = "\"'"
+# Universal newlines, as used when `read_entries` reads a file in text mode.
+LINE_BREAK = re.compile(rb"\r\n|\r|\n")
+
+
+def stripped(value: bytes, chars: str | None = None) -> tuple[int, bytes]:
+    """
+    Strips `chars` (or whitespace) from both ends of `value` the same way `str.strip`
+    would, returning the result along with its offset in `value`.
+    """
+    if value.isascii():
+        ascii_chars = WHITESPACE if chars is None else chars.encode()
+        lstripped = value.lstrip(ascii_chars)
+        return len(value) - len(lstripped), lstripped.rstrip(ascii_chars)
+    # Non-ASCII whitespace (such as a no-break space) is only stripped as text.
+    text = value.decode().lstrip(chars)
+    return len(value) - len(text.encode()), text.rstrip(chars).encode()
+
+
+def lines(data: bytes | mmap.mmap) -> Iterator[tuple[int, bytes]]:
+    """
+    Yields each line in `data` (without its line break) along with its offset.
+    """
+    pos = 0
+    for match in LINE_BREAK.finditer(data):
+        yield pos, data[pos : match.start()]
+        pos = match.end()
+    if pos < len(data):
+        yield pos, data[pos:]
+
+
+def scan_entries(data: bytes | mmap.mmap) -> dict[bytes, tuple[int, int, int, int]]:
+    """
+    Finds the same entries `read_entries` would, returning each key mapped to the
+    offset and length of the key and its value in `data`, without decoding anything.
+    """
+    entries: dict[bytes, tuple[int, int, int, int]] = {}
+    for pos, line in lines(data):
+        eq = line.find(b"=")
+        if eq >= 0 and not stripped(line)[1].startswith(b"#"):
+            key_off, key = stripped(line[:eq])
+            value_off, value = stripped(line[eq + 1 :])
+            quoted_off, value = stripped(value, QUOTES)
+            entries[key] = (
+                pos + key_off,
+                len(key),
+                pos + eq + 1 + value_off + quoted_off,
+                len(value),
+            )
+    return entries
+
+
+def pack_index(stamp: Stamp, entries: dict[bytes, tuple[int, int, int, int]]) -> bytes:
+    """
+    Serializes the entries found by `scan_entries` as an open-addressed hash index
+    (linear probing, at most half full).
+    """
+    slots = 8
+    while slots < len(entries) * 2:
+        slots *= 2
+    mask = slots - 1
+    index = [(0, 0, 0, 0, 0)] * slots
+    for key, (key_off, key_len, value_off, value_len) in entries.items():
+        h = key_hash(key)
+        i = h & mask
+        while index[i][1]:
+            i = (i + 1) & mask
+        index[i] = (h, key_off + 1, key_len, value_off, value_len)
+    header = HEADER.pack(MAGIC, VERSION, *stamp, slots)
+    return header + b"".join(SLOT.pack(*slot) for slot in index)
+
+
+class EnvIndex(Mapping[str, str]):
+    """
+    A memory-mapped env file, along with a hash index of where each key and value is
+    in it. Only the values that are looked up are ever decoded.
+    """
+
+    def __init__(self, data: bytes | mmap.mmap, index: bytes | mmap.mmap):
+        self._data = data
+        self._index = index
+        self._mask = HEADER.unpack_from(index)[-1] - 1
+
+    @classmethod
+    def load(
+        cls,
+        fileobj: IO[Any],
+        index_file: StrPath,
+        policy: PolicyCallable | None = None,
+    ) -> "EnvIndex":
+        """
+        Maps the opened env file, and its index from `index_file` if it was built for
+        this version of the file. Otherwise, the index is built and saved to
+        `index_file` (when possible) for next time.
+        """
+        info = os.fstat(fileobj.fileno())
+        stamp = Stamp.of(info)
+        if info.st_size:
+            data: bytes | mmap.mmap = mmap.mmap(
+                fileobj.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        else:
+            data = b""
+        index = cls._read_index(index_file, stamp, info.st_size, policy)
+        if index is None:
+            index = pack_index(stamp, scan_entries(data))
+            # A file modified within the racy window may change again without its
+            # stamp changing, so its index is not worth saving.
+            if not stamp.racy:
+                try:
+                    safe_write(index_file, index)
+                except OSError:
+                    pass
+        return cls(data, index)
+
+    @staticmethod
+    def _read_index(
+        index_file: StrPath,
+        stamp: Stamp,
+        size: int,
+        policy: PolicyCallable | None,
+    ) -> mmap.mmap | None:
+        try:
+            with safe_open(index_file, policy=policy, mode="rb") as f:
+                index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            magic, version, *stamped, slots = HEADER.unpack_from(index)
+        except struct.error:
+            magic, version, stamped, slots = b"", 0, [], 0
+        if (
+            magic != MAGIC
+            or version != VERSION
+            or tuple(stamped) != stamp
+            or stamp.racy
+            or len(index) != HEADER.size + slots * SLOT.size
+            or not EnvIndex._valid_slots(index, slots, size)
+        ):
+            index.close()
+            return None
+        return index
+
+    @staticmethod
+    def _valid_slots(index: mmap.mmap, slots: int, size: int) -> bool:
+        """
+        Checks that the index is a power of two, with at least one empty slot (so probes
+        end), and that every slot points inside the indexed file of `size` bytes.
+        """
+        if slots < 1 or slots & (slots - 1):
+            return False
+        used = 0
+        for i in range(slots):
+            _, key_off, key_len, value_off, value_len = SLOT.unpack_from(
+                index, HEADER.size + i * SLOT.size
+            )
+            if key_off:
+                used += 1
+                if key_off - 1 + key_len > size or value_off + value_len > size:
+                    return False
+        return used < slots
+
+    def _slots(self) -> Iterator[tuple[int, int, int, int, int]]:
+        for i in range(self._mask + 1):
+            yield SLOT.unpack_from(self._index, HEADER.size + i * SLOT.size)
+
+    def __getitem__(self, key: str) -> str:
+        key_bytes = key.encode()
+        h = key_hash(key_bytes)
+        data, mask = self._data, self._mask
+        i = h & mask
+        # Every slot is probed at most once, even if the index is (corruptly) full.
+        for _ in range(mask + 1):
+            slot_hash, key_off, key_len, value_off, value_len = SLOT.unpack_from(
+                self._index, HEADER.size + i * SLOT.size
+            )
+            if not key_off:
+                break
+            key_off -= 1
+            if slot_hash == h and data[key_off : key_off + key_len] == key_bytes:
+                return data[value_off : value_off + value_len].decode()
+            i = (i + 1) & mask
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for _, key_off, key_len, _, _ in self._slots():
+            if key_off:
+                yield self._data[key_off - 1 : key_off - 1 + key_len].decode()
+
+    def __len__(self) -> int:
+        return sum(1 for slot in self._slots() if slot[1])
@@ -8,3 +8,23 @@ class ConfigWarning(UserWarning):
 
 class PolicyError(Exception):
     pass
+
+
+class SourceUnavailable(ConfigError):
+    """
+    Raised by a source that could not be reached (or was not tried, because it has
+    been failing or a deadline has passed).
+    """
+
+
+class SchemaError(ConfigError):
+    """
+    Raised when one or more fields of a `Schema` could not be resolved. The `errors`
+    attribute maps each failing config key to a description of the problem.
+    """
+
+    def __init__(self, schema: str, errors: dict[str, str]):
+        self.schema = schema
+        self.errors = errors
+        details = "; ".join(f"`{key}` {msg}" for key, msg in errors.items())
+        super().__init__(f"{schema} has {len(errors)} invalid field(s): {details}")
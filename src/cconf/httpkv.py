@@ -0,0 +1,234 @@
+import http.client
+import json
+import queue
+import threading
+import time
+import warnings
+from collections.abc import Callable, Iterable, Mapping
+from typing import Any
+from urllib.parse import urlencode, urlsplit
+
+from .exceptions import ConfigError, ConfigWarning
+from .sources import Source
+
+
+def parse_json(body: bytes) -> Mapping[str, str]:
+    """
+    Parses a JSON object of keys to values. Non-string values are converted to strings,
+    so they behave like values from any other source.
+    """
+    data = json.loads(body)
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object.")
+    return {str(k): v if isinstance(v, str) else json.dumps(v) for k, v in data.items()}
+
+
+class HttpKVSource(Source):
+    """
+    A configuration source that reads from a key/value document served over HTTP. All
+    values are fetched with a single request on first use and kept in memory. Reads
+    revalidate the document (with `If-None-Match`) at most once every
+    `refresh_interval` seconds, and `watch=True` keeps it up to date from a background
+    thread that long-polls the server with a `wait` query parameter.
+
+    If revalidating fails, the last known values keep being served, and revalidation is
+    retried after `retry_interval` seconds, doubling with each consecutive failure (up
+    to `max_retry_interval`).
+    """
+
+    # The longest time to wait between revalidations while the server is failing.
+    max_retry_interval: float = 60.0
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        headers: Mapping[str, str] | None = None,
+        timeout: float = 10.0,
+        refresh_interval: float | None = None,
+        retry_interval: float = 1.0,
+        watch: bool = False,
+        wait: int = 60,
+        pool_size: int = 4,
+        parse: Callable[[bytes], Mapping[str, str]] = parse_json,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ConfigError(f"Unsupported URL: `{url}`")
+        self._url = url
+        self._scheme = parts.scheme
+        self._netloc = parts.netloc
+        self._path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self._headers = dict(headers or {})
+        self._timeout = timeout
+        self._refresh_interval = refresh_interval
+        self._retry_interval = retry_interval
+        self._wait = wait
+        self._parse = parse
+        self._pool: queue.LifoQueue[http.client.HTTPConnection] = queue.LifoQueue(
+            pool_size
+        )
+        # The current values, their ETag, and when they were last validated. Always
+        # replaced as a whole, so readers never see a partial update.
+        self._state: tuple[Mapping[str, str], str | None, float] | None = None
+        # Consecutive failed revalidations, and when to next attempt one.
+        self._failures = 0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._watcher: threading.Thread | None = None
+        if watch:
+            self._watcher = threading.Thread(target=self._watch, daemon=True)
+            self._watcher.start()
+
+    def __str__(self):
+        return "{}({})".format(self.__class__.__name__, self._url)
+
+    def _connection(self) -> http.client.HTTPConnection:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            if self._scheme == "https":
+                return http.client.HTTPSConnection(self._netloc, timeout=self._timeout)
+            return http.client.HTTPConnection(self._netloc, timeout=self._timeout)
+
+    def _release(self, conn: http.client.HTTPConnection):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _request(
+        self, etag: str | None, wait: int | None = None
+    ) -> tuple[int, bytes, str | None]:
+        """
+        Performs a (conditional) GET using a pooled connection, returning the status,
+        body, and ETag of the response.
+        """
+        path = self._path
+        headers = dict(self._headers)
+        if etag:
+            headers["If-None-Match"] = etag
+        if wait:
+            path += ("&" if "?" in path else "?") + urlencode({"wait": f"{wait}s"})
+        conn = self._connection()
+        if wait:
+            conn.timeout = self._timeout + wait
+            if conn.sock is not None:
+                conn.sock.settimeout(conn.timeout)
+        try:
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            raise
+        if wait:
+            conn.timeout = self._timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(conn.timeout)
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+        return response.status, body, response.getheader("ETag")
+
+    def _update(self, wait: int | None = None):
+        """
+        Fetches the document, or revalidates it if it has been fetched before.
+        """
+        state = self._state
+        etag = None if state is None else state[1]
+        try:
+            status, body, new_etag = self._request(etag, wait=wait)
+        except (OSError, http.client.HTTPException) as ex:
+            raise ConfigError(f"{self}: {ex}")
+        if status == 304 and state is not None:
+            self._state = (state[0], state[1], time.monotonic())
+        elif status == 200:
+            try:
+                values = self._parse(body)
+            except ValueError as ve:
+                raise ConfigError(f"{self}: {ve}")
+            self._state = (values, new_etag, time.monotonic())
+        else:
+            raise ConfigError(f"{self}: HTTP {status}")
+        self._failures = 0
+        self._retry_at = 0.0
+
+    def _failed(self, ce: ConfigError):
+        """
+        Backs off revalidating after a failure, warning at the start of each outage.
+        """
+        if not self._failures:
+            warnings.warn(f"{ce} (serving the last known values)", ConfigWarning)
+        delay = self._retry_interval * 2 ** min(self._failures, 16)
+        self._failures += 1
+        self._retry_at = time.monotonic() + min(delay, self.max_retry_interval)
+
+    def _values(self) -> Mapping[str, str]:
+        state = self._state
+        now = time.monotonic()
+        if state is None or (
+            self._refresh_interval is not None
+            and now - state[2] >= self._refresh_interval
+            and now >= self._retry_at
+        ):
+            # Only one thread fetches at a time; the rest use its result.
+            with self._lock:
+                if state is self._state and time.monotonic() >= self._retry_at:
+                    try:
+                        self._update()
+                    except ConfigError as ce:
+                        if state is None:
+                            raise
+                        self._failed(ce)
+                state = self._state
+        assert state is not None
+        return state[0]
+
+    def _watch(self):
+        while not self._closed.is_set():
+            try:
+                self._update(wait=self._wait if self._state is not None else None)
+            except ConfigError:
+                # Back off briefly, rather than hammering a failing server.
+                self._closed.wait(1.0)
+
+    @property
+    def remote(self) -> bool:
+        # Once fetched, the last known values are always available.
+        return self._state is None
+
+    def __getitem__(self, key: str) -> str:
+        return self._values()[key]
+
+    def keys(self) -> Iterable[str]:
+        return list(self._values())
+
+    def refresh(self):
+        """
+        Revalidates the values now, regardless of `refresh_interval`.
+        """
+        with self._lock:
+            self._update()
+
+    def reload(self):
+        self.refresh()
+
+    def prefetch(self, keys: Iterable[str]):
+        # Every value is fetched by the same request.
+        self._values()
+
+    def close(self):
+        """
+        Stops watching for changes, and closes any pooled connections.
+        """
+        self._closed.set()
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
@@ -0,0 +1,116 @@
+import json
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+from .exceptions import ConfigError
+from .policy import safe_write
+from .sources import BaseSource
+from .types import StrPath
+
+if TYPE_CHECKING:
+    from .base import Config
+
+VERSION = 1
+
+
+class Manifest:
+    """
+    The keys a `Config` resolved, and which of its sources served each, recorded (via
+    `cconf manifest`) so that later runs can prefetch them from every source at once,
+    rather than one lookup at a time as settings are resolved.
+
+    Since sources are checked in order, each source is prefetched with the keys it
+    served, along with the keys served by later sources (or by no source at all), so
+    that it knows ahead of time which keys it doesn't have.
+    """
+
+    def __init__(self, sources: list[dict[str, Any]], missing: list[str]):
+        self._sources = sources
+        self._missing = missing
+
+    @classmethod
+    def record(cls, config: "Config") -> "Manifest":
+        """
+        Builds a manifest from everything `config` has resolved so far.
+        """
+        sources = config._sources
+        served: list[list[str]] = [[] for _ in sources]
+        missing: list[str] = []
+        for key, configval in config._defined.items():
+            for source, keys in zip(sources, served):
+                if source is configval.source:
+                    keys.append(key)
+                    break
+            else:
+                missing.append(key)
+        return cls(
+            [{"name": str(s), "keys": keys} for s, keys in zip(sources, served)],
+            missing,
+        )
+
+    @classmethod
+    def read(cls, path: StrPath) -> "Manifest":
+        """
+        Reads a manifest written by `Manifest.write`, raising `ConfigError` if it is
+        from a different version of cconf, or is not a manifest.
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        try:
+            manifest = json.loads(data)
+            version = manifest["version"]
+            sources, missing = manifest["sources"], manifest["missing"]
+        except (ValueError, TypeError, KeyError):
+            raise ConfigError(f"Not a prefetch manifest: `{path}`")
+        if version != VERSION:
+            raise ConfigError(f"Unsupported prefetch manifest: `{path}`")
+        return cls(sources, missing)
+
+    def write(self, path: StrPath):
+        """
+        Atomically writes the manifest to `path`, readable only by the current user.
+        """
+        body = {"version": VERSION, "sources": self._sources, "missing": self._missing}
+        safe_write(path, json.dumps(body, indent=4).encode())
+
+    def __len__(self):
+        return sum(len(source["keys"]) for source in self._sources) + len(self._missing)
+
+    def prefetch(
+        self,
+        sources: Sequence[BaseSource],
+        max_workers: int | None = None,
+    ) -> list[tuple[BaseSource, Exception]]:
+        """
+        Prefetches the recorded keys of each of `sources` concurrently, returning any
+        source that failed along with its exception. Raises `ConfigError` if `sources`
+        are not the ones the manifest was recorded from.
+        """
+        if [str(source) for source in sources] != [s["name"] for s in self._sources]:
+            raise ConfigError("Prefetch manifest was recorded for different sources.")
+        work: list[tuple[BaseSource, list[str]]] = []
+        keys = list(self._missing)
+        for source, recorded in reversed(list(zip(sources, self._sources))):
+            keys = recorded["keys"] + keys
+            if keys:
+                work.append((source, keys))
+        if not work:
+            return []
+
+        def prefetch(source: BaseSource, keys: list[str]) -> Exception | None:
+            try:
+                source.prefetch(keys)
+            except Exception as ex:
+                # Prefetching is only an optimization; the keys are fetched again (and
+                # any errors reported) when they are looked up.
+                return ex
+            return None
+
+        with ThreadPoolExecutor(
+            max_workers or len(work), thread_name_prefix="cconf-prefetch"
+        ) as executor:
+            results = list(executor.map(lambda item: prefetch(*item), work))
+        return [
+            (source, ex) for (source, _), ex in zip(work, results) if ex is not None
+        ]
@@ -0,0 +1,173 @@
+import hashlib
+import mmap
+import struct
+import threading
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+from .exceptions import ConfigError
+from .policy import PolicyCallable, safe_open, safe_write
+from .sources import KeyIndex, Source
+from .stamps import stamp
+from .types import StrPath
+
+MAGIC = b"CCONFPAK"
+VERSION = 1
+
+# Magic, format version, number of entries, number of index slots.
+HEADER = struct.Struct("<8sIII")
+# Key hash, key offset, key length, value offset, value length. A key offset of zero
+# marks an empty slot, since offset zero is always the header.
+SLOT = struct.Struct("<QQIQI")
+
+
+def key_hash(key: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+def pack_entries(entries: Mapping[str, str]) -> bytes:
+    """
+    Serializes `entries` into the packed format: a header, an open-addressed hash index
+    (linear probing, at most half full), then the key and value blobs.
+    """
+    slots = 8
+    while slots < len(entries) * 2:
+        slots *= 2
+    mask = slots - 1
+    index = [(0, 0, 0, 0, 0)] * slots
+    blobs = bytearray()
+    offset = HEADER.size + SLOT.size * slots
+    for key, value in entries.items():
+        key_bytes, value_bytes = key.encode(), value.encode()
+        slot = (
+            key_hash(key_bytes),
+            offset + len(blobs),
+            len(key_bytes),
+            offset + len(blobs) + len(key_bytes),
+            len(value_bytes),
+        )
+        blobs += key_bytes + value_bytes
+        i = slot[0] & mask
+        while index[i][1]:
+            i = (i + 1) & mask
+        index[i] = slot
+    header = HEADER.pack(MAGIC, VERSION, len(entries), slots)
+    return header + b"".join(SLOT.pack(*slot) for slot in index) + blobs
+
+
+def write_packed(path: StrPath, entries: Mapping[str, str]):
+    """
+    Atomically writes `entries` to `path` in the packed format read by `PackedSource`.
+    """
+    safe_write(path, pack_entries(entries))
+
+
+class PackedSource(Source):
+    """
+    A configuration source that reads from a file written by `cconf pack`. The file is
+    memory-mapped, and each lookup is a hash index probe, so nothing is parsed up front
+    and the pages are shared by every process reading the same file.
+    """
+
+    def __init__(
+        self,
+        packed_file: StrPath,
+        policy: PolicyCallable | None = None,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        self._packed_file = packed_file
+        self._policy = policy
+        # The mapped file and its index mask, always replaced together so lookups never
+        # pair one version's mask with another's map.
+        self._table: tuple[mmap.mmap, int] | None = None
+        self._index: KeyIndex | None = None
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return "{}({})".format(self.__class__.__name__, self._packed_file)
+
+    def _load(self) -> tuple[mmap.mmap, int]:
+        with self._lock:
+            if self._table is None:
+                with safe_open(self._packed_file, policy=self._policy, mode="rb") as f:
+                    try:
+                        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    except ValueError:
+                        # Empty files can't be mapped.
+                        raise ConfigError(f"Empty packed file: {self._packed_file}")
+                try:
+                    magic, version, count, slots = HEADER.unpack_from(data)
+                except struct.error:
+                    magic, version, count, slots = b"", 0, 0, 0
+                if magic != MAGIC or version != VERSION:
+                    data.close()
+                    raise ConfigError(f"Unsupported packed file: {self._packed_file}")
+                # The index must be a power of two, with at least one empty slot (so
+                # probes end), and fit in the file.
+                if (
+                    slots < 1
+                    or slots & (slots - 1)
+                    or count >= slots
+                    or HEADER.size + SLOT.size * slots > len(data)
+                ):
+                    data.close()
+                    raise ConfigError(f"Corrupt packed file: {self._packed_file}")
+                self._table = (data, slots - 1)
+            return self._table
+
+    def __getitem__(self, key: str) -> str:
+        table = self._table
+        if table is None:
+            try:
+                table = self._load()
+            except OSError:
+                raise KeyError(key)
+        data, mask = table
+        key_bytes = key.encode()
+        h = key_hash(key_bytes)
+        i = h & mask
+        # Every slot is probed at most once, even if the index is (corruptly) full.
+        for _ in range(mask + 1):
+            slot_hash, key_off, key_len, value_off, value_len = SLOT.unpack_from(
+                data, HEADER.size + i * SLOT.size
+            )
+            if not key_off:
+                break
+            if slot_hash == h and data[key_off : key_off + key_len] == key_bytes:
+                return data[value_off : value_off + value_len].decode()
+            i = (i + 1) & mask
+        raise KeyError(key)
+
+    def keys(self) -> Iterable[str]:
+        try:
+            data, mask = self._load() if self._table is None else self._table
+        except OSError:
+            return []
+        keys: list[str] = []
+        for i in range(mask + 1):
+            _, key_off, key_len, _, _ = SLOT.unpack_from(
+                data, HEADER.size + i * SLOT.size
+            )
+            if key_off:
+                keys.append(data[key_off : key_off + key_len].decode())
+        return keys
+
+    def index(self) -> KeyIndex:
+        # A packed file is never modified once it has been mapped.
+        if self._index is None:
+            index = super().index()
+            if self._table is None:
+                return index
+            self._index = index
+        return self._index
+
+    def reload(self):
+        # Readers may still be using the old map, so it is left to be closed once
+        # they're done with it.
+        with self._lock:
+            self._table = None
+            self._index = None
+
+    def fingerprint(self) -> Any:
+        return list(stamp(self._packed_file) or ())
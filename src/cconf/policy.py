@@ -1,5 +1,7 @@
+import functools
 import os
 import stat
+import tempfile
 import warnings
 from collections.abc import Callable
 from typing import Any
@@ -9,29 +11,59 @@ from .types import StrPath
 
 PolicyCallable = Callable[[StrPath], None]
 
+_missing = object()
 
-def UserOnly(path: StrPath):
-    if os.name != "posix":
-        warnings.warn(
-            f"UserOnly policy for {path} is only enforced in posix environments.",
-            ConfigWarning,
-        )
-        return
-    info = os.stat(path)
+
+class StatPolicy:
+    """
+    A policy that only needs to look at a file's `os.stat_result`. When used with
+    `safe_open`, the check runs against an `os.fstat` of the already-opened file, so it
+    costs no extra path resolution and can't be raced by swapping the file. Verdicts
+    are cached per version of each file.
+    """
+
+    max_verdicts = 1024
+
+    def __init__(self, check: Callable[[StrPath, os.stat_result], None]):
+        self._check = check
+        self._verdicts: dict[tuple[int, ...], str | None] = {}
+        functools.update_wrapper(self, check)
+
+    def __call__(self, path: StrPath, info: os.stat_result | None = None):
+        if os.name != "posix":
+            warnings.warn(
+                f"{self.__name__} policy for {path} is only enforced in posix "
+                "environments.",
+                ConfigWarning,
+            )
+            return
+        if info is None:
+            info = os.stat(path)
+        key = (info.st_dev, info.st_ino, info.st_mtime_ns, info.st_mode, info.st_uid)
+        verdict = self._verdicts.get(key, _missing)
+        if verdict is _missing:
+            try:
+                self._check(path, info)
+                verdict = None
+            except PolicyError as pe:
+                verdict = str(pe)
+            if len(self._verdicts) >= self.max_verdicts:
+                self._verdicts.clear()
+            self._verdicts[key] = verdict
+        if verdict is not None:
+            raise PolicyError(verdict)
+
+
+@StatPolicy
+def UserOnly(path: StrPath, info: os.stat_result):
     if info.st_uid != os.getuid():
         raise PolicyError(f"UID mismatch for `{path}`")
     if bool(info.st_mode & stat.S_IRWXG) or bool(info.st_mode & stat.S_IRWXO):
         raise PolicyError(f"`{path}` has `group` and/or `other` permissions.")
 
 
-def UserOrGroup(path: StrPath):
-    if os.name != "posix":
-        warnings.warn(
-            f"UserOrGroup policy for {path} is only enforced in posix environments.",
-            ConfigWarning,
-        )
-        return
-    info = os.stat(path)
+@StatPolicy
+def UserOrGroup(path: StrPath, info: os.stat_result):
     if bool(info.st_mode & stat.S_IRWXO):
         raise PolicyError(f"`{path}` has `other` permissions.")
 
@@ -40,8 +72,32 @@ def safe_open(
     path: StrPath,
     *,
     policy: PolicyCallable | None = None,
+    mode: str = "r",
     **kwargs: Any,
 ):
-    if policy:
+    if policy and not isinstance(policy, StatPolicy):
         policy(path)
-    return open(path, "r", **kwargs)
+    fileobj = open(path, mode, **kwargs)
+    if isinstance(policy, StatPolicy):
+        try:
+            policy(path, os.fstat(fileobj.fileno()))
+        except BaseException:
+            fileobj.close()
+            raise
+    return fileobj
+
+
+def safe_write(path: StrPath, data: bytes):
+    """
+    Atomically replaces `path` with `data`, via a temporary file in the same directory
+    that is only readable by the current user.
+    """
+    dirname = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix=".cconf-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
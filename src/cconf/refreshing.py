@@ -0,0 +1,175 @@
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import NamedTuple
+
+from .sources import BaseSource
+
+
+class Entry(NamedTuple):
+    value: str | None
+    found: bool
+    fetched: float
+    # When a failed background refresh may be attempted again.
+    retry_at: float = 0.0
+
+
+class RefreshingSource(BaseSource):
+    """
+    Wraps any source (typically a remote one, such as `SecretServerSource`) with an
+    in-memory cache that is refreshed in the background:
+
+    * Values younger than `refresh_ahead * ttl` are served from memory.
+    * Older values are still served from memory, but also refreshed in a background
+      thread, so actively-read values are usually replaced before they go stale.
+    * Values older than `ttl + stale_ttl` are re-fetched before being returned.
+
+    Keys the inner source does not have are cached the same way. If a refresh fails,
+    the last known value keeps being served (and the refresh is retried no more than
+    once every `retry_interval` seconds). Concurrent fetches of the same key, whether in
+    the foreground or background, are combined into one.
+    """
+
+    def __init__(
+        self,
+        inner: BaseSource,
+        ttl: float,
+        stale_ttl: float = 0.0,
+        *,
+        refresh_ahead: float = 0.75,
+        retry_interval: float = 1.0,
+        max_workers: int = 4,
+    ):
+        self._inner = inner
+        self._ttl = ttl
+        self._stale_ttl = stale_ttl
+        self._refresh_after = ttl * refresh_ahead
+        self._retry_interval = retry_interval
+        self._max_workers = max_workers
+        self._entries: dict[str, Entry] = {}
+        self._inflight: dict[str, Future[Entry]] = {}
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    def __str__(self):
+        return "{}({})".format(self.__class__.__name__, self._inner)
+
+    def _fetch(self, key: str) -> Entry:
+        """
+        Fetches `key` from the inner source and caches the result. If a fetch of `key`
+        is already in progress, waits for (and returns) its result instead.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if future is None:
+                future = self._inflight[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            try:
+                entry = Entry(self._inner[key], True, time.monotonic())
+            except KeyError:
+                entry = Entry(None, False, time.monotonic())
+            self._entries[key] = entry
+            future.set_result(entry)
+            return entry
+        except BaseException as ex:
+            future.set_exception(ex)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _refresh(self, key: str):
+        try:
+            self._fetch(key)
+        except Exception:
+            entry = self._entries.get(key)
+            if entry is not None:
+                retry_at = time.monotonic() + self._retry_interval
+                self._entries[key] = entry._replace(retry_at=retry_at)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # Must be called with `_lock` held.
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self._max_workers, thread_name_prefix="cconf-refresh"
+            )
+        return self._executor
+
+    def _refresh_in_background(self, key: str):
+        with self._lock:
+            if key in self._inflight:
+                return
+            executor = self._pool()
+        executor.submit(self._refresh, key)
+
+    def __getitem__(self, key: str) -> str:
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is None:
+            entry = self._fetch(key)
+        else:
+            age = now - entry.fetched
+            if age >= self._ttl + self._stale_ttl and now >= entry.retry_at:
+                try:
+                    entry = self._fetch(key)
+                except Exception:
+                    # Keep serving the last known value while the source is failing.
+                    self._entries[key] = entry._replace(
+                        retry_at=now + self._retry_interval
+                    )
+            elif age >= self._refresh_after and now >= entry.retry_at:
+                self._refresh_in_background(key)
+        if not entry.found:
+            raise KeyError(key)
+        assert entry.value is not None
+        return entry.value
+
+    def keys(self) -> Iterable[str]:
+        return self._inner.keys()
+
+    def encrypt(self, value: str) -> str:
+        return self._inner.encrypt(value)
+
+    def decrypt(self, value: str, ttl: int | None = None) -> str:
+        return self._inner.decrypt(value, ttl=ttl)
+
+    def prefetch(self, keys: Iterable[str]):
+        """
+        Fetches every key that isn't already cached, concurrently.
+        """
+        missing = [key for key in keys if key not in self._entries]
+        if not missing:
+            return
+        with self._lock:
+            executor = self._pool()
+        futures = [executor.submit(self._fetch, key) for key in missing]
+        for future in futures:
+            # Failed keys are fetched (and fail) again when they are looked up.
+            future.exception()
+
+    def invalidate(self, key: str | None = None):
+        """
+        Drops the cached value of `key` (or every cached value), so the next read
+        fetches it from the inner source.
+        """
+        if key is None:
+            self._entries = {}
+        else:
+            self._entries.pop(key, None)
+
+    def reload(self):
+        self._inner.reload()
+        self.invalidate()
+
+    def close(self):
+        """
+        Stops the background refresh threads, after any in-progress refreshes finish.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
@@ -0,0 +1,182 @@
+import contextlib
+import contextvars
+import random
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import CancelledError
+from typing import NamedTuple, TypeVar
+
+from .exceptions import SourceUnavailable
+
+T = TypeVar("T")
+
+# When lookups in the current thread or task should stop waiting on remote sources, as a
+# `time.monotonic` value.
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar(
+    "cconf_deadline", default=None
+)
+
+
+@contextlib.contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """
+    Limits how long remote sources may be waited on, in total, by lookups in the
+    current thread or task until the block exits. Nested deadlines can only shorten an
+    outer one.
+    """
+    until = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(until if outer is None else min(outer, until))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    """
+    Returns the number of seconds left before the current deadline (possibly negative),
+    or `None` if there is no deadline.
+    """
+    until = _deadline.get()
+    return None if until is None else until - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+class Backoff(NamedTuple):
+    """
+    How often (and how long to wait before) retrying a failed request. Delays grow
+    exponentially from `base` up to `cap` seconds, with "full jitter": each delay is
+    picked at random between zero and its limit, so clients retrying at once spread out.
+    """
+
+    retries: int = 2
+    base: float = 0.1
+    cap: float = 2.0
+
+    def delays(self) -> Iterator[float]:
+        for attempt in range(self.retries):
+            yield random.uniform(0, min(self.cap, self.base * 2**attempt))
+
+
+class CircuitBreaker:
+    """
+    Fails fast once a remote service has failed `threshold` times in a row: for the
+    next `reset_timeout` seconds, requests are refused without being attempted. After
+    that, a single trial request is let through, and its success closes the circuit
+    again (while its failure re-opens it).
+    """
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """
+        One of "closed" (requests are attempted), "open" (requests are refused), or
+        "half-open" (a trial request may be attempted).
+        """
+        opened_at = self._opened_at
+        if opened_at is None:
+            return "closed"
+        if time.monotonic() - opened_at < self.reset_timeout:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        """
+        Returns whether a request may be attempted now.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._trial = True
+            return True
+
+    def success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+    def cancel(self):
+        """
+        Gives up on a request that got no response, without counting it as a success or
+        a failure, so that (if it was the trial request) another may be attempted.
+        """
+        with self._lock:
+            self._trial = False
+
+
+def call(
+    fn: Callable[[], T],
+    *,
+    retry_on: tuple[type[BaseException], ...],
+    backoff: Backoff | None = None,
+    breaker: CircuitBreaker | None = None,
+    name: str = "",
+) -> T:
+    """
+    Calls `fn`, retrying any of the `retry_on` exceptions with `backoff`. Raises
+    `SourceUnavailable` if every attempt fails, if `breaker` is open, or once the
+    current deadline has passed. Any other exception is raised as-is (and counts as a
+    response from the service, as far as `breaker` is concerned), unless the call was
+    cancelled or interrupted.
+
+    The messages of `SourceUnavailable` only name the service, so that each is reported
+    once per service; the last error is its `__cause__`.
+    """
+    if expired():
+        raise SourceUnavailable(f"{name}: deadline exceeded.")
+    if breaker is not None and not breaker.allow():
+        raise SourceUnavailable(f"{name}: unavailable after repeated failures.")
+    delays = backoff.delays() if backoff is not None else iter(())
+    while True:
+        try:
+            result = fn()
+        except retry_on as ex:
+            delay = next(delays, None)
+            left = remaining()
+            if delay is None or (left is not None and delay >= left):
+                if breaker is not None:
+                    breaker.failure()
+                raise SourceUnavailable(f"{name}: requests are failing.") from ex
+            time.sleep(delay)
+        except CancelledError:
+            # Cancelled (such as by an executor shutting down) before any response.
+            if breaker is not None:
+                breaker.cancel()
+            raise
+        except Exception:
+            if breaker is not None:
+                breaker.success()
+            raise
+        except BaseException:
+            # Interrupted (by KeyboardInterrupt or SystemExit), which says nothing about
+            # whether the service is up.
+            if breaker is not None:
+                breaker.cancel()
+            raise
+        else:
+            if breaker is not None:
+                breaker.success()
+            return result
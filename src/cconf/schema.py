@@ -0,0 +1,273 @@
+import datetime
+import types
+import typing
+from collections.abc import Callable
+from typing import Any, ClassVar, NamedTuple
+
+from . import resilience
+from .base import Config, ConfigValue, Undefined, config, undefined
+from .ciphers import DecryptError
+from .exceptions import ConfigError, SchemaError, SourceUnavailable
+
+
+class Field:
+    """
+    Describes how a single `Schema` attribute is resolved. Any option left unset is
+    inferred: the key defaults to the attribute name, and the cast to its annotation.
+    """
+
+    def __init__(
+        self,
+        default: Any = undefined,
+        *,
+        cast: Callable | None | Undefined = undefined,
+        sensitive: bool = False,
+        ttl: int | datetime.timedelta | None = None,
+        key: str | None = None,
+    ):
+        if isinstance(ttl, datetime.timedelta):
+            ttl = int(ttl.total_seconds())
+        self.default = default
+        self.cast = cast
+        self.sensitive = sensitive
+        self.ttl = ttl
+        self.key = key
+        self.name = ""
+
+    def __repr__(self):
+        return f"Field({self.name!r}, key={self.key!r}, sensitive={self.sensitive})"
+
+
+def infer_cast(hint: Any) -> Callable | None:
+    """
+    Returns the cast for a type annotation. Optional types cast to their inner type,
+    `Any` does not cast at all, and anything else must be callable on a string.
+    """
+    if hint is Any:
+        return None
+    origin = typing.get_origin(hint)
+    if origin is typing.Union or origin is types.UnionType:
+        args = [arg for arg in typing.get_args(hint) if arg is not type(None)]
+        if len(args) == 1:
+            return infer_cast(args[0])
+    elif origin is None and callable(hint):
+        return hint
+    raise TypeError(f"Cannot infer a cast for `{hint}`; use Field(cast=...) instead.")
+
+
+class SchemaMeta(type):
+    def __new__(mcs, name: str, bases: tuple[type, ...], namespace: dict[str, Any]):
+        annotations = namespace.get("__annotations__")
+        if annotations is None and "__annotate__" in namespace:
+            # Python 3.14+ evaluates class annotations lazily.
+            annotations = namespace["__annotate__"](1)
+        fields: dict[str, Field] = {}
+        for base in reversed(bases):
+            fields.update(getattr(base, "__fields__", {}))
+        own: list[str] = []
+        for attr in annotations or {}:
+            if attr.startswith("_") or typing.get_origin(annotations[attr]) is ClassVar:
+                continue
+            value = namespace.pop(attr, undefined)
+            field = value if isinstance(value, Field) else Field(value)
+            field.name = attr
+            if field.key is None:
+                field.key = attr
+            fields[attr] = field
+            if not any(attr in getattr(b, "__fields__", {}) for b in bases):
+                own.append(attr)
+        namespace["__slots__"] = tuple(own)
+        namespace["__fields__"] = fields
+        namespace["__plan__"] = None
+        return super().__new__(mcs, name, bases, namespace)
+
+
+class Plan(NamedTuple):
+    fields: tuple[Field, ...]
+    casts: tuple[Callable | None, ...]
+
+
+class Schema(metaclass=SchemaMeta):
+    """
+    A declarative set of configuration values. Each annotated attribute is a field,
+    resolved eagerly (and all at once) when the schema is instantiated:
+
+        class Settings(Schema):
+            DEBUG: bool = False
+            DATABASE_URL: dict = Field(cast=DatabaseDict, sensitive=True)
+
+        settings = Settings()
+
+    Every problem (missing values, bad casts) is collected and raised together as a
+    `SchemaError`. Resolved values are recorded in the config's `defined` values just
+    like individual `config(...)` calls.
+    """
+
+    __fields__: ClassVar[dict[str, Field]]
+    __plan__: ClassVar[Plan | None]
+
+    def __init__(self, config: Config = config):
+        values = self.resolve(config)
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"{self.__class__.__name__} is read-only.")
+
+    def __repr__(self):
+        values = ", ".join(
+            f"{name}={'**********' if field.sensitive else repr(getattr(self, name))}"
+            for name, field in self.__fields__.items()
+        )
+        return f"{self.__class__.__name__}({values})"
+
+    def asdict(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__fields__}
+
+    @classmethod
+    def compile(cls) -> Plan:
+        """
+        Builds (once per class) the resolver plan: the fields and their casts. Casts
+        are inferred from the type annotations here, so an unusable annotation fails
+        when the schema is first used rather than when its field is read.
+        """
+        if cls.__plan__ is None:
+            hints = typing.get_type_hints(cls)
+            fields = tuple(cls.__fields__.values())
+            casts = tuple(
+                infer_cast(hints[f.name]) if f.cast is undefined else f.cast
+                for f in fields
+            )
+            cls.__plan__ = Plan(fields, casts)
+        return cls.__plan__
+
+    @classmethod
+    def resolve(cls, config: Config = config) -> dict[str, Any]:
+        """
+        Resolves every field in a single pass over the configuration sources, and
+        returns a dictionary of field names to cast values.
+        """
+        plan = cls.compile()
+        # Field names mapped to their raw value, source, and value as stored.
+        found: dict[str, tuple[Any, Any, Any]] = {}
+        checked: list[str] = []
+        pending = list(plan.fields)
+        layer = config._layer.get()
+        if layer is not None:
+            for field in pending:
+                if field.key in layer.values:
+                    raw = layer.values[field.key]
+                    found[field.name] = (raw, layer, raw)
+            pending = [field for field in pending if field.name not in found]
+        sources = config._sources
+        for source, entries in zip(sources, config._snapshot_entries(sources)):
+            if not pending:
+                break
+            checked.append(str(source))
+            if source.remote and resilience.expired():
+                config.diagnostics.record(
+                    "unavailable",
+                    "",
+                    f"{source} skipped: deadline exceeded.",
+                    source,
+                    stacklevel=3,
+                )
+                continue
+            sensitive: list[tuple[Field, str]] = []
+            missing: list[Field] = []
+            for i, field in enumerate(pending):
+                try:
+                    raw = config._read(source, field.key, entries)
+                except KeyError:
+                    missing.append(field)
+                    continue
+                except SourceUnavailable as su:
+                    # The source could not be reached at all, which is reported once for
+                    # the source, and the remaining fields aren't looked up in it.
+                    config.diagnostics.record(
+                        "unavailable", "", str(su), source, stacklevel=3
+                    )
+                    missing.extend(pending[i:])
+                    break
+                except ConfigError as ce:
+                    config.diagnostics.record(
+                        "source", field.key, str(ce), source, stacklevel=3
+                    )
+                    missing.append(field)
+                    continue
+                if field.sensitive:
+                    sensitive.append((field, raw))
+                else:
+                    found[field.name] = (raw, source, raw)
+            # Decrypt everything this source holds as one batch, so the source's keys
+            # are loaded (and policy checked) once.
+            for field, raw in sensitive:
+                try:
+                    decrypted = source.decrypt(raw, ttl=field.ttl)
+                    found[field.name] = (decrypted, source, raw)
+                except SourceUnavailable as su:
+                    config.diagnostics.record(
+                        "unavailable", "", str(su), source, stacklevel=3
+                    )
+                    missing.append(field)
+                except ConfigError as ce:
+                    config.diagnostics.record(
+                        "source", field.key, str(ce), source, stacklevel=3
+                    )
+                    missing.append(field)
+                except DecryptError:
+                    config.diagnostics.record(
+                        "decrypt",
+                        field.key,
+                        f"`{field.key}` found in {source} but improperly encrypted "
+                        "(or expired).",
+                        source,
+                        stacklevel=3,
+                    )
+                    missing.append(field)
+            pending = missing
+
+        values: dict[str, Any] = {}
+        defined: dict[str, ConfigValue] = {}
+        errors: dict[str, str] = {}
+        for field, cast in zip(plan.fields, plan.casts):
+            if field.name in found:
+                raw, source, stored = found[field.name]
+            elif field.default is not undefined:
+                raw, source, stored = field.default, None, None
+                if field.sensitive and not config._debug:
+                    config.diagnostics.record(
+                        "sensitive-default",
+                        field.key,
+                        f"`{field.key}` is marked sensitive but using a default value.",
+                        stacklevel=3,
+                    )
+            else:
+                errors[field.key] = "not found in any of: " + ", ".join(checked)
+                values[field.name] = undefined
+                continue
+            try:
+                value = config._perform_cast(raw, cast, key=field.key)
+            except ValueError as ve:
+                errors[field.key] = str(ve)
+                values[field.name] = undefined
+                continue
+            values[field.name] = value
+            defined[field.key] = ConfigValue(
+                raw,
+                value,
+                source,
+                field.default,
+                field.sensitive,
+                field.ttl,
+                cast,
+                stored,
+            )
+        config._define(defined)
+
+        if errors:
+            error = SchemaError(cls.__name__, errors)
+            if not config._debug:
+                raise error
+            config.diagnostics.record("schema", cls.__name__, str(error), stacklevel=3)
+        return values
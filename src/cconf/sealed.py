@@ -0,0 +1,91 @@
+import io
+import time
+from typing import Any
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from .ciphers import Cipher, DecryptError
+from .exceptions import ConfigError
+from .policy import safe_open
+from .sources import EnvFile, read_entries
+from .types import StrPath
+
+MAGIC = "cconf-sealed"
+VERSION = 1
+
+
+def seal(text: str, cipher: Cipher) -> str:
+    """
+    Encrypts `text` with a new data key, and wraps the data key with `cipher`. The
+    result is a header line, the wrapped data key, and the encrypted text.
+    """
+    data_key = Fernet.generate_key()
+    wrapped = cipher.encrypt(data_key.decode())
+    body = Fernet(data_key).encrypt(text.encode()).decode()
+    return f"{MAGIC} {VERSION}\n{wrapped}\n{body}\n"
+
+
+def unseal(sealed: str, cipher: Cipher) -> tuple[str, int]:
+    """
+    Decrypts text sealed by `seal`, returning it along with the time it was sealed.
+    Raises `ConfigError` if `sealed` is not in the expected format, and `DecryptError`
+    if it can't be decrypted with `cipher`.
+    """
+    lines = sealed.strip().split("\n")
+    if len(lines) != 3 or lines[0].split(" ")[0] != MAGIC:
+        raise ConfigError("Not a sealed file.")
+    if lines[0] != f"{MAGIC} {VERSION}":
+        raise ConfigError("Unsupported sealed file.")
+    data_key = cipher.decrypt(lines[1].strip())
+    try:
+        fernet = Fernet(data_key)
+        token = lines[2].strip().encode()
+        return fernet.decrypt(token).decode(), fernet.extract_timestamp(token)
+    except (ValueError, InvalidToken):
+        raise DecryptError
+
+
+class EncryptedEnvFile(EnvFile):
+    """
+    A configuration source that reads from an env file sealed by `cconf seal`. The
+    whole file is encrypted with a single data key (itself encrypted with `keys`), so
+    it is decrypted once when first read, and every value is then served from memory.
+
+    Since the file is encrypted as a whole, its values may be used as `sensitive`
+    values as they are, and a `ttl` applies to when the file was sealed.
+    """
+
+    def __init__(self, env_file: StrPath, **kwargs: Any):
+        super().__init__(env_file, **kwargs)
+        self._sealed_at = 0
+
+    def _load(self) -> dict[str, str]:
+        items = self._items
+        if items is None:
+            with self._lock:
+                if self._items is None:
+                    with safe_open(self._env_file, policy=self._policy) as fileobj:
+                        sealed = fileobj.read()
+                    try:
+                        text, self._sealed_at = unseal(sealed, self._cipher)
+                    except ConfigError as ce:
+                        raise ConfigError(f"{self}: {ce}")
+                    except DecryptError:
+                        raise ConfigError(f"{self}: could not be decrypted.")
+                    self._items = read_entries(io.StringIO(text))
+                items = self._items
+        return items
+
+    def encrypt(self, value: str) -> str:
+        # Values are added to the file before it is sealed, so are not encrypted alone.
+        raise ConfigError(f"{self}: values in a sealed file are encrypted as a whole.")
+
+    def decrypt(self, value: str, ttl: int | None = None) -> str:
+        if ttl is not None and self._sealed_at + ttl < time.time():
+            raise DecryptError
+        return value
+
+    def fingerprint(self) -> Any:
+        # Never compile decrypted values into a snapshot; reading this file is already
+        # a single decrypt.
+        return None
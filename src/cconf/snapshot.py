@@ -0,0 +1,121 @@
+import hashlib
+import json
+from collections.abc import Sequence
+from typing import TYPE_CHECKING, Any
+
+from .exceptions import ConfigError
+from .policy import safe_write
+from .sources import BaseSource
+from .types import StrPath
+
+if TYPE_CHECKING:
+    from .base import Config
+
+MAGIC = "cconf-snapshot"
+VERSION = 1
+
+
+class Snapshot:
+    """
+    The raw values a `Config` resolved from its file-backed sources, compiled ahead of
+    time (via `cconf compile`) so they can be loaded with a single read. Values are
+    stored exactly as they appear in each source, so sensitive values remain encrypted
+    with that source's keys.
+
+    For each source, the snapshot records its name, its fingerprint (`None` for sources
+    that are always read live, like `HostEnv`), and the keys that were looked up in it,
+    mapped to their raw values (or `None` if the source did not have them).
+    """
+
+    def __init__(self, sources: list[dict[str, Any]]):
+        self._sources = sources
+        # The last list of sources checked against, and the resulting entries.
+        self._checked: tuple[Sequence[BaseSource] | None, Any] = (None, None)
+
+    @classmethod
+    def compile(cls, config: "Config") -> "Snapshot":
+        """
+        Builds a snapshot from everything `config` has resolved so far.
+        """
+        sources = config._sources
+        fingerprints = [source.fingerprint() for source in sources]
+        entries: list[dict[str, str | None] | None] = [
+            None if fingerprint is None else {} for fingerprint in fingerprints
+        ]
+        for key, configval in config._defined.items():
+            for source, found in zip(sources, entries):
+                if found is None:
+                    continue
+                try:
+                    found[key] = source[key]
+                except KeyError:
+                    found[key] = None
+                if source is configval.source:
+                    break
+        return cls(
+            [
+                {"name": str(s), "fingerprint": f, "entries": e}
+                for s, f, e in zip(sources, fingerprints, entries)
+            ]
+        )
+
+    @classmethod
+    def read(cls, path: StrPath) -> "Snapshot":
+        """
+        Reads a snapshot written by `Snapshot.write`, raising `ConfigError` if it is
+        from a different version of cconf, or has been corrupted.
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        header, _, body = data.partition(b"\n")
+        try:
+            magic, version, digest = header.decode().split(" ")
+        except ValueError:
+            raise ConfigError(f"Not a configuration snapshot: `{path}`")
+        if magic != MAGIC or version != str(VERSION):
+            raise ConfigError(f"Unsupported configuration snapshot: `{path}`")
+        if digest != "sha256=" + hashlib.sha256(body).hexdigest():
+            raise ConfigError(f"Configuration snapshot is corrupt: `{path}`")
+        return cls(json.loads(body)["sources"])
+
+    def write(self, path: StrPath):
+        """
+        Atomically writes the snapshot to `path`, readable only by the current user.
+        """
+        body = json.dumps({"sources": self._sources}, separators=(",", ":")).encode()
+        digest = hashlib.sha256(body).hexdigest()
+        header = f"{MAGIC} {VERSION} sha256={digest}\n".encode()
+        safe_write(path, header + body)
+
+    def __len__(self):
+        keys: set[str] = set()
+        for source in self._sources:
+            keys.update(source["entries"] or ())
+        return len(keys)
+
+    def recheck(self):
+        """
+        Forgets which sources the snapshot was last checked against, so that their
+        fingerprints are checked again by the next lookup.
+        """
+        self._checked = (None, None)
+
+    def entries(
+        self, sources: Sequence[BaseSource]
+    ) -> list[dict[str, str | None] | None] | None:
+        """
+        Returns the snapshot's entries for each of `sources`, or `None` if the sources
+        don't match the ones the snapshot was compiled from, or any of them has changed
+        since. The result is cached for as long as the same list of sources is used.
+        """
+        checked, entries = self._checked
+        if sources is not checked:
+            entries = None
+            if len(sources) == len(self._sources) and all(
+                str(source) == compiled["name"]
+                and source.fingerprint() == compiled["fingerprint"]
+                for source, compiled in zip(sources, self._sources)
+            ):
+                entries = [compiled["entries"] for compiled in self._sources]
+            self._checked = (sources, entries)
+        return entries
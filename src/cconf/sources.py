@@ -1,13 +1,19 @@
+import bisect
 import os
-from collections.abc import Iterable, Mapping
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator, Mapping
 from typing import Any, TextIO
 from warnings import warn
 
 from cryptography.fernet import Fernet
 
-from .ciphers import Base64, Cipher, Identity, KeyFile, Keys
+from .ciphers import Base64, Cipher, Identity, KeyFile, cipher_for
 from .exceptions import ConfigError
 from .policy import PolicyCallable, safe_open
+from .stamps import Stamp, stamp
 from .types import StrPath
 
 
@@ -26,17 +32,198 @@ def read_entries(fileobj: TextIO) -> dict[str, str]:
     return entries
 
 
+class MissCache:
+    """
+    Remembers keys that were not found in a file-backed source, for as long as `path`
+    (the file itself, or the directory of per-key files) is unchanged. The path is
+    re-checked at most once every `interval` seconds, which invalidates every cached
+    miss at once if it was modified.
+    """
+
+    def __init__(self, path: StrPath, interval: float = 1.0):
+        self._path = path
+        self._interval = interval
+        self._stamp: Stamp | None = None
+        self._checked = 0.0
+        self._misses: set[str] = set()
+
+    def __contains__(self, key: str) -> bool:
+        misses = self._misses
+        if key not in misses:
+            return False
+        now = time.monotonic()
+        if now - self._checked >= self._interval:
+            self._checked = now
+            if stamp(self._path) != self._stamp:
+                self.clear()
+                return False
+        return True
+
+    def add(self, key: str):
+        if not self._misses:
+            self._stamp = stamp(self._path)
+            self._checked = time.monotonic()
+        # Don't cache against a path that may have changed within its own timestamp
+        # granularity (including just now, after the lookup that missed). A path that
+        # does not exist is as fresh as the directory it would be created in.
+        basis = self._stamp or stamp(os.path.dirname(os.path.abspath(self._path)))
+        if basis is not None and not basis.racy:
+            self._misses.add(key)
+
+    def clear(self):
+        self._misses = set()
+
+
+class Entries(dict[str, str]):
+    """
+    The parsed entries of an env file (a `dict` that can be weakly referenced).
+    """
+
+    __slots__ = ("__weakref__",)
+
+
+class ParsedCache:
+    """
+    A process-wide cache of parsed files (and directory listings), keyed by the `Stamp`
+    of what was parsed, so identical files are only parsed once no matter how many
+    sources read them. Parsed values are shared for as long as any source holds them,
+    and the most recently used are also kept (up to roughly `max_bytes`) for sources
+    created later.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._shared: weakref.WeakValueDictionary[tuple[str, Stamp], Any] = (
+            weakref.WeakValueDictionary()
+        )
+        self._recent: OrderedDict[tuple[str, Stamp], tuple[Any, int]] = OrderedDict()
+        self._recent_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, basis: Stamp | None) -> Any:
+        if basis is None or basis.racy:
+            return None
+        key = (kind, basis)
+        with self._lock:
+            if key in self._recent:
+                self._recent.move_to_end(key)
+            return self._shared.get(key)
+
+    def add(self, kind: str, basis: Stamp | None, value: Any, size: int):
+        """
+        Shares `value` (roughly `size` bytes) as the parsed contents of the file or
+        directory with stamp `basis`. Values that may have changed within the stamp's
+        timestamp granularity are not shared.
+        """
+        if basis is None or basis.racy:
+            return
+        key = (kind, basis)
+        with self._lock:
+            self._shared[key] = value
+            if size > self.max_bytes:
+                return
+            old = self._recent.pop(key, None)
+            if old is not None:
+                self._recent_bytes -= old[1]
+            self._recent[key] = (value, size)
+            self._recent_bytes += size
+            while self._recent_bytes > self.max_bytes:
+                _, (_, evicted) = self._recent.popitem(last=False)
+                self._recent_bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._shared.clear()
+            self._recent.clear()
+            self._recent_bytes = 0
+
+
+parsed_cache = ParsedCache()
+
+
+class KeyIndex:
+    """
+    A sorted snapshot of a source's keys, for finding keys by prefix with a binary
+    search rather than a scan of every key.
+    """
+
+    def __init__(self, keys: Iterable[str]):
+        self._keys = sorted(keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def prefixed(self, prefix: str) -> Iterator[str]:
+        keys = self._keys
+        i = bisect.bisect_left(keys, prefix)
+        while i < len(keys) and keys[i].startswith(prefix):
+            yield keys[i]
+            i += 1
+
+
 class BaseSource:
     """
     Minimal interface for implementing a configuration source.
     """
 
+    # Whether lookups may wait on the network. Remote sources are skipped once a
+    # `Config.deadline` has passed.
+    remote: bool = False
+
     def __str__(self):
         return self.__class__.__name__
 
     def __getitem__(self, key: str) -> str:
         raise NotImplementedError()
 
+    def keys(self) -> Iterable[str]:
+        """
+        Returns the keys this source has values for. Sources that can't enumerate their
+        keys return none.
+        """
+        return []
+
+    def items(self) -> Iterator[tuple[str, str]]:
+        for key in self.keys():
+            try:
+                yield key, self[key]
+            except KeyError:
+                # Removed since it was listed.
+                continue
+
+    def index(self) -> KeyIndex:
+        """
+        Returns a `KeyIndex` of this source's keys. Sources that can tell when their
+        keys change should cache this.
+        """
+        return KeyIndex(self.keys())
+
+    def fingerprint(self) -> Any:
+        """
+        Returns a JSON-serializable value that changes whenever the contents of this
+        source may have changed, or `None` if that can't be determined cheaply (in which
+        case the source is always read live, rather than from a compiled snapshot).
+        """
+        return None
+
+    def reload(self):
+        """
+        Forgets anything read from the underlying storage, so it is read again by the
+        next lookup. Used by `Config.reload`.
+        """
+        pass
+
+    def prefetch(self, keys: Iterable[str]):
+        """
+        Fetches `keys` ahead of time (all at once, where possible), so that looking them
+        up doesn't have to wait on the underlying storage. Used by `Config.prefetch`.
+        Sources that are cheap to read do nothing.
+        """
+        pass
+
     def encrypt(self, value: str) -> str:
         raise NotImplementedError()
 
@@ -68,13 +255,17 @@ class Source(BaseSource):
         elif isinstance(keys, (str, os.PathLike)):
             self._cipher = KeyFile(keys)
         elif isinstance(keys, Iterable):
-            self._cipher = Keys(keys)
+            self._cipher = cipher_for(keys)
         else:
             raise ConfigError("Unsupported `keys` type.")
 
     def __getitem__(self, key: str) -> str:
         return self._environ[key]
 
+    def keys(self) -> Iterable[str]:
+        # Copy the keys, since `os.environ` may change while they are being used.
+        return list(self._environ)
+
     def encrypt(self, value: str) -> str:
         return self._cipher.encrypt(value)
 
@@ -96,28 +287,102 @@ class EnvFile(Source):
     A configuration source that reads from the specified file.
     """
 
+    # Whether to remember lookups that failed because the file could not be read.
+    cache_misses: bool = True
+
+    # Whether to memory-map the file and look values up via an index (saved alongside
+    # the file as `index_file`), instead of parsing the whole file.
+    lazy: bool = False
+
     def __init__(
         self,
         env_file: StrPath,
         policy: PolicyCallable | None = None,
+        cache_misses: bool | None = None,
+        lazy: bool | None = None,
+        index_file: StrPath | None = None,
         **kwargs: Any,
     ):
         super().__init__(**kwargs)
         self._env_file = env_file
         self._policy = policy
-        self._items = None
+        self._lazy = self.lazy if lazy is None else lazy
+        self._index_file = index_file or f"{os.fspath(env_file)}.idx"
+        self._items: Mapping[str, str] | None = None
+        self._index: KeyIndex | None = None
+        self._lock = threading.Lock()
+        if cache_misses is None:
+            cache_misses = self.cache_misses
+        self._misses = MissCache(env_file) if cache_misses else None
 
     def __str__(self):
         return "{}({})".format(self.__class__.__name__, self._env_file)
 
+    def _load(self) -> Mapping[str, str]:
+        """
+        Returns the parsed entries of the file, raising `OSError` if it can't be read.
+        """
+        items = self._items
+        if items is None:
+            # Only one thread parses the file; any others wait here for its result.
+            with self._lock:
+                if self._items is None:
+                    with safe_open(self._env_file, policy=self._policy) as fileobj:
+                        if self._lazy:
+                            from .envindex import EnvIndex
+
+                            self._items = EnvIndex.load(
+                                fileobj, self._index_file, self._policy
+                            )
+                        else:
+                            self._items = self._parse(fileobj)
+                items = self._items
+        return items
+
+    def _parse(self, fileobj: TextIO) -> Mapping[str, str]:
+        # Identical files are parsed once, and shared by every source that reads them.
+        basis = Stamp.of(os.fstat(fileobj.fileno()))
+        entries = parsed_cache.get("env", basis)
+        if entries is None:
+            entries = Entries(read_entries(fileobj))
+            size = sum(len(k) + len(v) for k, v in entries.items())
+            parsed_cache.add("env", basis, entries, size)
+        return entries
+
     def __getitem__(self, key: str) -> str:
-        if self._items is None:
+        items = self._items
+        if items is None:
+            if self._misses is not None and key in self._misses:
+                raise KeyError(key)
             try:
-                with safe_open(self._env_file, policy=self._policy) as fileobj:
-                    self._items = read_entries(fileobj)
+                items = self._load()
             except OSError:
+                if self._misses is not None:
+                    self._misses.add(key)
                 raise KeyError(key)
-        return self._items[key]
+        return items[key]
+
+    def keys(self) -> Iterable[str]:
+        try:
+            return list(self._load())
+        except OSError:
+            return []
+
+    def index(self) -> KeyIndex:
+        # The entries never change once loaded, so neither does the index.
+        if self._index is None or self._items is None:
+            self._index = super().index()
+        return self._index
+
+    def reload(self):
+        with self._lock:
+            self._items = None
+            self._index = None
+        if self._misses is not None:
+            self._misses.clear()
+
+    def fingerprint(self) -> Any:
+        return list(stamp(self._env_file) or ())
 
 
 class EnvDir(Source):
@@ -126,32 +391,187 @@ class EnvDir(Source):
     a separate file inside that directory.
     """
 
+    # Whether to remember keys with no file, until the directory is modified.
+    cache_misses: bool = True
+
     def __init__(
         self,
         env_dir: StrPath,
         policy: PolicyCallable | None = None,
+        cache_misses: bool | None = None,
         **kwargs: Any,
     ):
         super().__init__(**kwargs)
         self._env_dir = env_dir
         self._policy = policy
+        if cache_misses is None:
+            cache_misses = self.cache_misses
+        self._misses = MissCache(env_dir) if cache_misses else None
+        self._index: tuple[Stamp | None, KeyIndex] | None = None
 
     def __str__(self):
         return "{}({})".format(self.__class__.__name__, self._env_dir)
 
     def __getitem__(self, key: str) -> str:
+        if self._misses is not None and key in self._misses:
+            raise KeyError(key)
         entry_path = os.path.join(self._env_dir, key)
         try:
             with safe_open(entry_path, policy=self._policy) as fileobj:
                 return fileobj.read().strip()
+        except FileNotFoundError:
+            if self._misses is not None:
+                self._misses.add(key)
+            raise KeyError(key)
         except OSError:
             raise KeyError(key)
 
+    def keys(self) -> Iterable[str]:
+        try:
+            with os.scandir(self._env_dir) as it:
+                return [
+                    e.name for e in it if not e.name.startswith(".") and e.is_file()
+                ]
+        except OSError:
+            return []
+
+    def index(self) -> KeyIndex:
+        # Adding or removing a key file changes the directory's stamp.
+        current = stamp(self._env_dir)
+        cached = self._index
+        if cached is None or cached[0] != current or current is None or current.racy:
+            # Listings are shared by every source for the same directory.
+            index = parsed_cache.get("dir", current)
+            if index is None:
+                index = super().index()
+                size = sum(len(key) for key in index)
+                parsed_cache.add("dir", current, index, size)
+            cached = self._index = (current, index)
+        return cached[1]
+
+    def reload(self):
+        # Values are always read live, but missing keys are remembered.
+        if self._misses is not None:
+            self._misses.clear()
+
+    def fingerprint(self) -> Any:
+        try:
+            with os.scandir(self._env_dir) as it:
+                entries = [[e.name, *Stamp.of(e.stat())] for e in it if not e.is_dir()]
+        except OSError:
+            return []
+        return [list(stamp(self._env_dir) or ()), sorted(entries)]
+
 
 class SecretsDir(EnvDir):
     """
     An EnvDir that always expects plaintext entries. For use with filesystem-mounted
     Kubernetes secrets.
+
+    Kubernetes mounts each version of a secret in its own directory, and updates it by
+    pointing the `..data` symlink at a new one. When `..data` exists, every entry of the
+    version it points to is read at once, and served from memory until the symlink
+    changes (checked at most once every `check_interval` seconds), so a rotated secret
+    is reloaded exactly once, and never seen half-updated.
     """
 
     default_cipher = Identity
+
+    # How often to check whether `..data` points at a new version, in seconds.
+    check_interval: float = 1.0
+
+    def __init__(
+        self,
+        env_dir: StrPath,
+        policy: PolicyCallable | None = None,
+        cache_misses: bool | None = None,
+        **kwargs: Any,
+    ):
+        super().__init__(env_dir, policy, cache_misses, **kwargs)
+        self._data_link = os.path.join(env_dir, "..data")
+        # The `..data` target, and every entry of that version (both `None` if the
+        # directory is not a Kubernetes secret mount).
+        self._snapshot: tuple[str | None, dict[str, str] | None] = (None, None)
+        self._version_index: tuple[str | None, KeyIndex] | None = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _target(self) -> str | None:
+        try:
+            return os.readlink(self._data_link)
+        except OSError:
+            return None
+
+    def _read_version(
+        self, target: str | None
+    ) -> tuple[str | None, dict[str, str] | None]:
+        # A version directory is removed once it is replaced, possibly while it is
+        # being read, in which case the new version is read instead.
+        for _ in range(3):
+            if target is None:
+                break
+            entries: dict[str, str] = {}
+            try:
+                with os.scandir(os.path.join(self._env_dir, target)) as it:
+                    for e in it:
+                        if not e.name.startswith(".") and e.is_file():
+                            with safe_open(e.path, policy=self._policy) as fileobj:
+                                entries[e.name] = fileobj.read().strip()
+            except OSError:
+                target = self._target()
+                continue
+            current = self._target()
+            if current == target:
+                return target, entries
+            target = current
+        return None, None
+
+    def _load(self) -> dict[str, str] | None:
+        """
+        Returns every entry of the current version of the secret, or `None` if the
+        directory is not a Kubernetes secret mount.
+        """
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return snapshot[1]
+        target = self._target()
+        if target != snapshot[0]:
+            # Only one thread reads the new version; any others wait here for it.
+            with self._lock:
+                snapshot = self._snapshot
+                if target != snapshot[0]:
+                    snapshot = self._snapshot = self._read_version(target)
+        self._checked = now
+        return snapshot[1]
+
+    def __getitem__(self, key: str) -> str:
+        entries = self._load()
+        if entries is None:
+            return super().__getitem__(key)
+        return entries[key]
+
+    def keys(self) -> Iterable[str]:
+        entries = self._load()
+        if entries is None:
+            return super().keys()
+        return list(entries)
+
+    def index(self) -> KeyIndex:
+        if self._load() is None:
+            return super().index()
+        target, entries = self._snapshot
+        cached = self._version_index
+        if cached is None or cached[0] != target:
+            cached = self._version_index = (target, KeyIndex(entries or ()))
+        return cached[1]
+
+    def reload(self):
+        super().reload()
+        with self._lock:
+            self._snapshot = (None, None)
+            self._checked = 0.0
+
+    def fingerprint(self) -> Any:
+        # Secrets are stored in plaintext, so are never written to compiled snapshots.
+        return None
@@ -0,0 +1,112 @@
+import os
+import re
+import sqlite3
+import threading
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from typing import Any
+
+from .exceptions import ConfigError
+from .policy import PolicyCallable
+from .sources import Source
+from .stamps import stamp
+from .types import StrPath
+
+identifier_re = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def check_table(table: str) -> str:
+    if not identifier_re.match(table):
+        raise ConfigError(f"Invalid table name: `{table}`")
+    return table
+
+
+def write_sqlite(
+    database: StrPath,
+    entries: Mapping[str, str],
+    table: str = "config",
+):
+    """
+    Writes `entries` (such as those returned by `read_entries`) to a table in a SQLite
+    database, creating both if necessary. All entries are written in one transaction,
+    and the database is switched to WAL mode so readers are never blocked by updates.
+    """
+    check_table(table)
+    conn = sqlite3.connect(database)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID"
+            )
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {table} (key, value) VALUES (?, ?)",
+                entries.items(),
+            )
+    finally:
+        conn.close()
+
+
+class SqliteSource(Source):
+    """
+    A configuration source that reads from a `(key, value)` table in a SQLite database.
+    Each lookup is a primary key query, so nothing is loaded into memory up front. Each
+    thread gets its own read-only connection, which keeps its compiled statement cached.
+    """
+
+    def __init__(
+        self,
+        database: StrPath,
+        table: str = "config",
+        policy: PolicyCallable | None = None,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        self._database = database
+        self._policy = policy
+        self._select = f"SELECT value FROM {check_table(table)} WHERE key = ?"
+        self._select_keys = f"SELECT key FROM {table} ORDER BY key"
+        self._local = threading.local()
+
+    def __str__(self):
+        return "{}({})".format(self.__class__.__name__, self._database)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self._policy:
+                self._policy(self._database)
+            uri = Path(os.path.abspath(self._database)).as_uri() + "?mode=ro"
+            conn = self._local.conn = sqlite3.connect(uri, uri=True)
+        return conn
+
+    def __getitem__(self, key: str) -> str:
+        try:
+            row = self._connection().execute(self._select, (key,)).fetchone()
+        except (OSError, sqlite3.Error):
+            raise KeyError(key)
+        if row is None:
+            raise KeyError(key)
+        return row[0]
+
+    def keys(self) -> Iterable[str]:
+        try:
+            rows = self._connection().execute(self._select_keys).fetchall()
+        except (OSError, sqlite3.Error):
+            return []
+        return [row[0] for row in rows]
+
+    def fingerprint(self) -> Any:
+        # Writes in WAL mode may only touch the -wal file until a checkpoint.
+        wal = f"{self._database}-wal"
+        return [list(stamp(self._database) or ()), list(stamp(wal) or ())]
+
+    def close(self):
+        """
+        Closes the calling thread's connection, if it has one.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
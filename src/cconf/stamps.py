@@ -0,0 +1,42 @@
+import os
+import time
+from typing import NamedTuple
+
+from .types import StrPath
+
+# Filesystem timestamps are only as precise as the kernel's clock tick, so a file can
+# change without its mtime changing if both happen within the same tick. Like git's
+# "racily clean" check, anything modified this recently is not trusted to be stable.
+RACY_WINDOW_NS = 2_000_000_000
+
+
+class Stamp(NamedTuple):
+    """
+    Identifies a particular version of a file or directory.
+    """
+
+    dev: int
+    ino: int
+    size: int
+    mtime_ns: int
+
+    @classmethod
+    def of(cls, info: os.stat_result) -> "Stamp":
+        return cls(info.st_dev, info.st_ino, info.st_size, info.st_mtime_ns)
+
+    @property
+    def racy(self) -> bool:
+        """
+        Whether this version is too recent to be told apart from a later one.
+        """
+        return time.time_ns() - self.mtime_ns < RACY_WINDOW_NS
+
+
+def stamp(path: StrPath) -> Stamp | None:
+    """
+    Returns the current `Stamp` of `path`, or `None` if it cannot be stat-ed.
+    """
+    try:
+        return Stamp.of(os.stat(path))
+    except OSError:
+        return None
@@ -0,0 +1,214 @@
+import copy
+import os
+import threading
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+from .exceptions import ConfigError
+from .policy import PolicyCallable, safe_open
+from .sources import KeyIndex, MissCache, Source, parsed_cache
+from .stamps import Stamp
+from .types import StrPath
+
+
+def load_json(data: bytes) -> Any:
+    try:
+        import orjson
+    except ImportError:
+        import json
+
+        return json.loads(data)
+    return orjson.loads(data)
+
+
+def load_toml(data: bytes) -> Any:
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise ConfigError("Reading TOML before Python 3.11 requires `tomli`.")
+    return tomllib.loads(data.decode())
+
+
+def load_yaml(data: bytes) -> Any:
+    try:
+        import yaml
+    except ImportError:
+        raise ConfigError("Reading YAML requires `pyyaml`.")
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    return yaml.load(data, Loader=loader)
+
+
+class Flattened(dict[str, Any]):
+    """
+    Every path in a parsed document, mapped to the value (or sub-tree) at that path.
+    """
+
+    __slots__ = ("leaves", "__weakref__")
+
+    def __init__(self, tree: Mapping[str, Any], separators: tuple[str, ...]):
+        super().__init__()
+        # The paths of scalar (and list) values, joined with the first separator.
+        self.leaves: list[str] = []
+        self._add(tree, [], separators)
+
+    def _add(
+        self,
+        tree: Mapping[str, Any],
+        path: list[str],
+        separators: tuple[str, ...],
+    ):
+        for name, value in tree.items():
+            parts = path + [str(name)]
+            for sep in separators:
+                self[sep.join(parts)] = value
+            if isinstance(value, Mapping):
+                self._add(value, parts, separators)
+            else:
+                self.leaves.append(separators[0].join(parts))
+
+
+class StructuredSource(Source):
+    """
+    Base class for configuration sources that read a nested document (a JSON object,
+    TOML table, or YAML mapping). Every path in the document is indexed when the file
+    is first read, joined by each of `separators`, so `config("database.replica.host")`
+    (or `config("database__replica__host")`) is a single dictionary lookup. Looking up a
+    table returns it as a `dict`, which may be passed to casts such as `DatabaseDict`.
+
+    Values are returned as parsed, so numbers, booleans, and lists are only converted
+    to strings by the default `str` cast. Tables and lists are returned as copies, since
+    the parsed document is shared by every source reading the same file.
+    """
+
+    # Whether to remember lookups that failed because the file could not be read.
+    cache_misses: bool = True
+
+    @staticmethod
+    def parse(data: bytes) -> Any:
+        raise NotImplementedError()
+
+    def __init__(
+        self,
+        path: StrPath,
+        policy: PolicyCallable | None = None,
+        cache_misses: bool | None = None,
+        separators: Iterable[str] = (".", "__"),
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        self._path = path
+        self._policy = policy
+        self._separators = tuple(separators)
+        if not self._separators:
+            raise ConfigError("At least one separator is required.")
+        self._items: Flattened | None = None
+        self._index: KeyIndex | None = None
+        self._lock = threading.Lock()
+        if cache_misses is None:
+            cache_misses = self.cache_misses
+        self._misses = MissCache(path) if cache_misses else None
+
+    def __str__(self):
+        return "{}({})".format(self.__class__.__name__, self._path)
+
+    def _load(self) -> Flattened:
+        """
+        Returns the flattened document, raising `OSError` if it can't be read.
+        """
+        items = self._items
+        if items is None:
+            with self._lock:
+                if self._items is None:
+                    self._items = self._read()
+                items = self._items
+        return items
+
+    def _read(self) -> Flattened:
+        with safe_open(self._path, policy=self._policy, mode="rb") as fileobj:
+            basis = Stamp.of(os.fstat(fileobj.fileno()))
+            # Shared by every source reading the same version of the file, with the
+            # same separators.
+            kind = f"{self.__class__.__name__}:{' '.join(self._separators)}"
+            items = parsed_cache.get(kind, basis)
+            if items is None:
+                data = fileobj.read()
+                try:
+                    tree = self.parse(data)
+                except ConfigError:
+                    raise
+                except Exception as ex:
+                    raise ConfigError(f"{self}: {ex}")
+                if not isinstance(tree, Mapping):
+                    raise ConfigError(f"{self}: expected a mapping at the top level.")
+                items = Flattened(tree, self._separators)
+                parsed_cache.add(kind, basis, items, len(data) * len(self._separators))
+        return items
+
+    def __getitem__(self, key: str) -> Any:
+        items = self._items
+        if items is None:
+            if self._misses is not None and key in self._misses:
+                raise KeyError(key)
+            try:
+                items = self._load()
+            except OSError:
+                if self._misses is not None:
+                    self._misses.add(key)
+                raise KeyError(key)
+        value = items[key]
+        if isinstance(value, (dict, list)):
+            return copy.deepcopy(value)
+        return value
+
+    def keys(self) -> Iterable[str]:
+        try:
+            return list(self._load().leaves)
+        except OSError:
+            return []
+
+    def index(self) -> KeyIndex:
+        # The document never changes once loaded, so neither does the index.
+        if self._index is None or self._items is None:
+            self._index = super().index()
+        return self._index
+
+    def reload(self):
+        with self._lock:
+            self._items = None
+            self._index = None
+        if self._misses is not None:
+            self._misses.clear()
+
+    def fingerprint(self) -> Any:
+        # Parsed values (tables, dates, and so on) aren't always JSON-serializable, and
+        # are already parsed once per process, so are never compiled into snapshots.
+        return None
+
+
+class JsonSource(StructuredSource):
+    """
+    A configuration source that reads from a JSON file, using `orjson` if installed.
+    """
+
+    parse = staticmethod(load_json)
+
+
+class TomlSource(StructuredSource):
+    """
+    A configuration source that reads from a TOML file, using `tomllib` (or `tomli`
+    before Python 3.11).
+    """
+
+    parse = staticmethod(load_toml)
+
+
+class YamlSource(StructuredSource):
+    """
+    A configuration source that reads from a YAML file, using PyYAML's C loader if it
+    is available. Only standard YAML tags are loaded.
+    """
+
+    parse = staticmethod(load_yaml)
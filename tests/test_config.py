@@ -1,22 +1,38 @@
+import asyncio
+import base64
+import json
 import os
+import shutil
 import stat
+import sys
 import tempfile
+import threading
 import time
 import unittest
+import warnings
+from unittest import mock
 
 from cryptography.fernet import Fernet
 
 from cconf import (
     Config,
+    ConfigError,
     ConfigWarning,
     EnvDir,
     EnvFile,
     PolicyError,
     Secret,
     SecretsDir,
+    StatPolicy,
     UserOnly,
+    envindex,
+    sources,
     undefined,
 )
+from cconf.ciphers import AEADKeys, DecryptError, KeyFile
+from cconf.cli import main
+from cconf.policy import safe_open
+from cconf.stamps import Stamp
 
 
 class ConfigTests(unittest.TestCase):
@@ -46,6 +62,75 @@ class ConfigTests(unittest.TestCase):
                 value = config("SECRET_KEY", cast=Secret, sensitive=True, ttl=300)
                 self.assertEqual(value, undefined)
 
+    def test_aead(self):
+        old, new = AEADKeys.generate_key(), AEADKeys.generate_key()
+        old_value = AEADKeys([old]).encrypt("old-secret")
+        keys = AEADKeys([new, old])
+        new_value = keys.encrypt("new-secret")
+        config = Config({"OLD": old_value, "NEW": new_value}, keys=keys)
+        self.assertEqual(config("OLD", sensitive=True), "old-secret")
+        self.assertEqual(config("NEW", sensitive=True), "new-secret")
+        # Tokens from unknown keys, or tampered with, are rejected.
+        with self.assertRaises(DecryptError):
+            AEADKeys([new]).decrypt(old_value)
+        tampered = bytearray(base64.urlsafe_b64decode(old_value))
+        tampered[-1] ^= 1
+        with self.assertRaises(DecryptError):
+            keys.decrypt(base64.urlsafe_b64encode(tampered).decode())
+        with self.assertRaises(DecryptError):
+            keys.decrypt(Fernet(Fernet.generate_key()).encrypt(b"fernet").decode())
+        with mock.patch("cconf.ciphers.time.time", return_value=time.time() - 600):
+            expired = keys.encrypt("expired")
+        self.assertEqual(keys.decrypt(expired, ttl=900), "expired")
+        with self.assertRaises(DecryptError):
+            keys.decrypt(expired, ttl=300)
+
+    def test_aead_keys(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            key_file = os.path.join(dirname, "aead.key")
+            main("genkey", "--aead", "-o", key_file)
+            os.chmod(key_file, stat.S_IRUSR | stat.S_IWUSR)
+            with open(key_file) as f:
+                key = f.read()
+            self.assertTrue(key.startswith("aead:"))
+            with mock.patch("cconf.cli.log") as log:
+                main("encrypt", "--keyfile", key_file, "secret")
+            token = log.call_args[0][0]
+            # AEAD keys are recognized by their prefix, whether from a file or a list.
+            self.assertEqual(AEADKeys([key]).decrypt(token), "secret")
+            for keys in (key_file, [key], [key.encode()]):
+                config = Config({"SECRET": token}, keys=keys)
+                self.assertEqual(config("SECRET", sensitive=True), "secret")
+            with self.assertRaises(ConfigError):
+                Config({}, keys=[key, Fernet.generate_key()])
+
+    def test_diagnostics(self):
+        key = Fernet.generate_key()
+        config = Config({"TOKEN": "plaintext"}, keys=[key], diagnostics="collect")
+        for _ in range(3):
+            self.assertEqual(config("TOKEN", "default", sensitive=True), "default")
+        report = config.diagnostics.report()
+        self.assertEqual(
+            [(issue["kind"], issue["key"], issue["count"]) for issue in report],
+            [("decrypt", "TOKEN", 3), ("sensitive-default", "TOKEN", 3)],
+        )
+        # Each distinct issue is only warned about once.
+        config.setup({"TOKEN": "plaintext"}, keys=[key], diagnostics="warn")
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            for _ in range(3):
+                config("TOKEN", "default", sensitive=True)
+        self.assertEqual(len(caught), 2)
+        config.diagnostics.action = "raise"
+        with self.assertRaises(ConfigError):
+            config("TOKEN", "default", sensitive=True)
+        with mock.patch("cconf.cli.log") as log:
+            with mock.patch("cconf.cli.importlib.import_module") as import_module:
+                import_module.return_value.config = config
+                main("check")
+        log.assert_any_call("Issues")
+        log.assert_any_call("    [{}] {} ({}x)", "decrypt", mock.ANY, 4)
+
     def test_envdir(self):
         with tempfile.TemporaryDirectory() as dirname:
             config = Config(EnvDir(dirname))
@@ -77,6 +162,131 @@ class ConfigTests(unittest.TestCase):
                 with self.assertWarns(ConfigWarning):
                     config("OTHER_KEY")
 
+    def test_lazy_envfile(self):
+        contents = (
+            "# comment\nHOSTNAME=example.com\n  PORT = '8080' \r\n"
+            'CERT="-----BEGIN-----"\nHOSTNAME=override.com\nNAME=café\nEMPTY=\n'
+        )
+        with tempfile.TemporaryDirectory() as dirname:
+            envfile = os.path.join(dirname, "env")
+            with open(envfile, "w", newline="") as f:
+                f.write(contents)
+            past = time.time() - 60
+            os.utime(envfile, (past, past))
+            eager = EnvFile(envfile)
+            source = EnvFile(envfile, lazy=True)
+            self.assertEqual(dict(source.items()), dict(eager.items()))
+            self.assertEqual(source["HOSTNAME"], "override.com")
+            self.assertEqual(source["NAME"], "café")
+            with self.assertRaises(KeyError):
+                source["MISSING"]
+            self.assertTrue(os.path.exists(envfile + ".idx"))
+            # The saved index is reused by other sources for the same file.
+            with mock.patch("cconf.envindex.scan_entries") as scan_entries:
+                self.assertEqual(EnvFile(envfile, lazy=True)["PORT"], "8080")
+                scan_entries.assert_not_called()
+            # And rebuilt once the file changes.
+            with open(envfile, "a") as f:
+                f.write("EXTRA=1\n")
+            os.utime(envfile, (past + 1, past + 1))
+            self.assertEqual(EnvFile(envfile, lazy=True)["EXTRA"], "1")
+            # Indexes of recently-modified files are not saved.
+            index_file = os.path.join(dirname, "recent.idx")
+            with open(envfile, "a") as f:
+                f.write("RECENT=1\n")
+            source = EnvFile(envfile, lazy=True, index_file=index_file)
+            self.assertEqual(source["RECENT"], "1")
+            self.assertFalse(os.path.exists(index_file))
+
+    def test_lazy_envfile_corrupt_index(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            envfile = os.path.join(dirname, "env")
+            with open(envfile, "w") as f:
+                f.write("A=1\n")
+            past = time.time() - 60
+            os.utime(envfile, (past, past))
+            header = envindex.HEADER.pack(
+                envindex.MAGIC, envindex.VERSION, *Stamp.of(os.stat(envfile)), 4
+            )
+            corrupt = {
+                # Every slot is occupied, so probes would never end.
+                "full": header + envindex.SLOT.pack(1, 1, 1, 0, 0) * 4,
+                # Offsets past the end of the file.
+                "offsets": header + envindex.SLOT.pack(1, 1, 1, 100, 1) * 4,
+            }
+            for name, index in corrupt.items():
+                with self.subTest(name):
+                    with open(envfile + ".idx", "wb") as f:
+                        f.write(index)
+                    # The index is rebuilt, rather than used.
+                    self.assertEqual(EnvFile(envfile, lazy=True)["A"], "1")
+
+    def test_lazy_envfile_lines(self):
+        contents = (
+            "A=1\r\nB=2\rC=3\r\r\n\xa0D\u2003=\xa0'4'\u3000\n\x1cE=5\x1f\n"
+            " # comment=6\rF=café \n"
+        )
+        with tempfile.TemporaryDirectory() as dirname:
+            envfile = os.path.join(dirname, "env")
+            with open(envfile, "w", encoding="utf-8", newline="") as f:
+                f.write(contents)
+            # Both parsers split lines and strip whitespace the same way.
+            eager = dict(EnvFile(envfile).items())
+            self.assertEqual(dict(EnvFile(envfile, lazy=True).items()), eager)
+            self.assertEqual(
+                eager, {"A": "1", "B": "2", "C": "3", "D": "4", "E": "5", "F": "café"}
+            )
+
+    def test_parsed_cache(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            envfile = os.path.join(dirname, "env")
+            with open(envfile, "w") as f:
+                f.write("HOSTNAME=example.com\n")
+            past = time.time() - 60
+            os.utime(envfile, (past, past))
+            with mock.patch.object(
+                sources, "read_entries", wraps=sources.read_entries
+            ) as reader:
+                first = EnvFile(envfile)
+                second = EnvFile(envfile)
+                self.assertEqual(first["HOSTNAME"], "example.com")
+                self.assertEqual(second["HOSTNAME"], "example.com")
+                self.assertIs(first._items, second._items)
+                self.assertEqual(reader.call_count, 1)
+                # A changed file is parsed again.
+                with open(envfile, "a") as f:
+                    f.write("PORT=8080\n")
+                os.utime(envfile, (past + 1, past + 1))
+                self.assertEqual(EnvFile(envfile)["PORT"], "8080")
+                self.assertEqual(reader.call_count, 2)
+                # Recently-modified files are not shared.
+                with open(envfile, "a") as f:
+                    f.write("RECENT=1\n")
+                self.assertEqual(EnvFile(envfile)["RECENT"], "1")
+                self.assertEqual(EnvFile(envfile)["RECENT"], "1")
+                self.assertEqual(reader.call_count, 4)
+            # Directory listings are shared the same way.
+            os.utime(dirname, (past, past))
+            self.assertIs(EnvDir(dirname).index(), EnvDir(dirname).index())
+
+    def test_parsed_cache_limit(self):
+        cache = sources.ParsedCache(max_bytes=10)
+        stamps = [sources.Stamp(0, ino, 1, 0) for ino in range(3)]
+        values = [sources.Entries(KEY=str(ino)) for ino in range(3)]
+        for basis, value in zip(stamps, values):
+            cache.add("env", basis, value, 4)
+        # Only the most recent values are kept once nothing else references them.
+        del value, values
+        self.assertIsNone(cache.get("env", stamps[0]))
+        self.assertEqual(cache.get("env", stamps[1]), {"KEY": "1"})
+        self.assertEqual(cache.get("env", stamps[2]), {"KEY": "2"})
+        # Values still in use are shared, however large.
+        big = sources.Entries(KEY="big")
+        cache.add("env", stamps[0], big, 100)
+        self.assertIs(cache.get("env", stamps[0]), big)
+        cache.clear()
+        self.assertIsNone(cache.get("env", stamps[0]))
+
     def test_multi_source(self):
         key = Fernet.generate_key()
         encrypted = Fernet(key).encrypt(b"postgres://localhost").decode()
@@ -137,6 +347,54 @@ class ConfigTests(unittest.TestCase):
             with open(os.path.join(dirname, "SOME_KEY"), "w") as f:
                 f.write("supersecret\n")
             self.assertEqual(config("SOME_KEY", sensitive=True), "supersecret")
+            # The policy (and miss caching) may be passed positionally, as with EnvDir.
+            os.chmod(os.path.join(dirname, "SOME_KEY"), 0o644)
+            config = Config(SecretsDir(dirname, UserOnly, False))
+            with self.assertRaises(PolicyError):
+                config("SOME_KEY", sensitive=True)
+            # Plaintext secrets are never compiled into snapshots.
+            self.assertIsNone(SecretsDir(dirname).fingerprint())
+
+    def test_secrets_mount(self):
+        def write_version(dirname, version, **entries):
+            os.mkdir(os.path.join(dirname, version))
+            for name, value in entries.items():
+                with open(os.path.join(dirname, version, name), "w") as f:
+                    f.write(value)
+            # Swap versions the way the kubelet does.
+            os.symlink(version, os.path.join(dirname, "..data_tmp"))
+            os.replace(
+                os.path.join(dirname, "..data_tmp"), os.path.join(dirname, "..data")
+            )
+
+        with tempfile.TemporaryDirectory() as dirname:
+            write_version(dirname, "..v1", USERNAME="admin", PASSWORD="secret\n")
+            for name in ("USERNAME", "PASSWORD"):
+                os.symlink(os.path.join("..data", name), os.path.join(dirname, name))
+            source = SecretsDir(dirname)
+            source.check_interval = 0.0
+            config = Config(source)
+            with mock.patch.object(
+                sources, "safe_open", wraps=sources.safe_open
+            ) as opener:
+                self.assertEqual(config("USERNAME"), "admin")
+                self.assertEqual(config("PASSWORD", sensitive=True), "secret")
+                self.assertEqual(sorted(source.keys()), ["PASSWORD", "USERNAME"])
+                self.assertEqual(opener.call_count, 2)
+                write_version(dirname, "..v2", USERNAME="admin", PASSWORD="rotated")
+                shutil.rmtree(os.path.join(dirname, "..v1"))
+                self.assertEqual(source["PASSWORD"], "rotated")
+                self.assertEqual(source["USERNAME"], "admin")
+                self.assertEqual(opener.call_count, 4)
+                with self.assertRaises(KeyError):
+                    source["MISSING"]
+            # Versions are not re-checked more often than `check_interval`.
+            source.check_interval = 60.0
+            write_version(dirname, "..v3", PASSWORD="ignored")
+            self.assertEqual(source["PASSWORD"], "rotated")
+            source.reload()
+            self.assertEqual(source["PASSWORD"], "ignored")
+            self.assertEqual(list(source.index()), ["PASSWORD"])
 
     def test_casting(self):
         config = Config({"SOME_KEY": 1})
@@ -144,3 +402,285 @@ class ConfigTests(unittest.TestCase):
         self.assertEqual(config("SOME_KEY", cast=None), 1)
         self.assertEqual(config("OTHER_KEY", 1), "1")
         self.assertEqual(config("OTHER_KEY", 1, cast=None), 1)
+
+    def test_threaded(self):
+        key = Fernet.generate_key()
+        with tempfile.TemporaryDirectory() as dirname:
+            key_file = os.path.join(dirname, "secret.key")
+            env_file = os.path.join(dirname, "env")
+            with open(key_file, "wb") as f:
+                f.write(key)
+            os.chmod(key_file, stat.S_IRUSR | stat.S_IWUSR)
+            with open(env_file, "w") as f:
+                for i in range(50):
+                    token = Fernet(key).encrypt(f"secret-{i}".encode()).decode()
+                    f.write(f"PLAIN_{i}=value-{i}\nSECRET_{i}={token}\n")
+            config = Config(EnvFile(env_file, keys=key_file))
+            barrier = threading.Barrier(64)
+            errors = []
+            read_entries = sources.read_entries
+
+            def slow_read(fileobj):
+                # Widen the window for concurrent loads.
+                time.sleep(0.05)
+                return read_entries(fileobj)
+
+            def hammer(offset):
+                barrier.wait()
+                try:
+                    for n in range(200):
+                        i = (offset + n) % 50
+                        self.assertEqual(config(f"PLAIN_{i}"), f"value-{i}")
+                        secret = config(f"SECRET_{i}", sensitive=True)
+                        self.assertEqual(secret, f"secret-{i}")
+                        self.assertEqual(config.defined[f"PLAIN_{i}"], f"value-{i}")
+                except Exception as ex:
+                    errors.append(ex)
+
+            interval = sys.getswitchinterval()
+            sys.setswitchinterval(1e-6)
+            try:
+                with mock.patch.object(
+                    sources, "read_entries", side_effect=slow_read
+                ) as reader:
+                    threads = [
+                        threading.Thread(target=hammer, args=(i,)) for i in range(64)
+                    ]
+                    for t in threads:
+                        t.start()
+                    for t in threads:
+                        t.join()
+            finally:
+                sys.setswitchinterval(interval)
+            self.assertEqual(errors, [])
+            self.assertEqual(reader.call_count, 1)
+            self.assertEqual(len(config.defined), 100)
+
+    def test_miss_cache(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            past = time.time() - 60
+            os.utime(dirname, (past, past))
+            source = EnvDir(dirname)
+            config = Config(source)
+            with mock.patch.object(
+                sources, "safe_open", wraps=sources.safe_open
+            ) as opener:
+                for _ in range(3):
+                    with self.assertRaises(KeyError):
+                        config("SOME_KEY")
+                self.assertEqual(opener.call_count, 1)
+                with open(os.path.join(dirname, "SOME_KEY"), "w") as f:
+                    f.write("some value")
+                # Skip waiting out the interval between directory checks.
+                source._misses._checked = 0.0
+                self.assertEqual(config("SOME_KEY"), "some value")
+            os.utime(dirname, (past, past))
+            config = Config(EnvDir(dirname, cache_misses=False))
+            with mock.patch.object(
+                sources, "safe_open", wraps=sources.safe_open
+            ) as opener:
+                for _ in range(3):
+                    with self.assertRaises(KeyError):
+                        config("OTHER_KEY")
+                self.assertEqual(opener.call_count, 3)
+
+    def test_stat_policy(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            env_file = os.path.join(dirname, "env")
+            with open(env_file, "w") as f:
+                f.write("SOME_KEY=some value\n")
+            os.chmod(env_file, stat.S_IRUSR | stat.S_IWUSR)
+            checked = []
+
+            @StatPolicy
+            def Counting(path, info):
+                checked.append(info.st_mode)
+
+            # Checks run against the open file, without stat-ing the path again.
+            with mock.patch("os.stat", side_effect=AssertionError):
+                for _ in range(3):
+                    with safe_open(env_file, policy=Counting) as fileobj:
+                        self.assertIn("SOME_KEY", fileobj.read())
+                    with safe_open(env_file, policy=UserOnly) as fileobj:
+                        fileobj.read()
+            self.assertEqual(len(checked), 1)
+            os.chmod(env_file, stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP)
+            with safe_open(env_file, policy=Counting):
+                pass
+            self.assertEqual(len(checked), 2)
+            with self.assertRaises(PolicyError):
+                safe_open(env_file, policy=UserOnly)
+
+    def test_key_rotation(self):
+        old_key, new_key = Fernet.generate_key(), Fernet.generate_key()
+        old_value = Fernet(old_key).encrypt(b"old-secret").decode()
+        new_value = Fernet(new_key).encrypt(b"new-secret").decode()
+        with tempfile.TemporaryDirectory() as dirname:
+            key_file = os.path.join(dirname, "secret.key")
+            with open(key_file, "wb") as f:
+                f.write(old_key)
+            os.chmod(key_file, stat.S_IRUSR | stat.S_IWUSR)
+            # Backdate the file, since very recently modified files are always reloaded.
+            past = time.time() - 60
+            os.utime(key_file, (past, past))
+            first, second = KeyFile(key_file), KeyFile(key_file)
+            # Both KeyFiles share the same parsed keys.
+            self.assertIs(first._load_keys(), second._load_keys())
+            self.assertEqual(first.decrypt(old_value), "old-secret")
+            with self.assertRaises(DecryptError):
+                first.decrypt(new_value)
+            # Rotate the keys by atomically replacing the file.
+            rotated = os.path.join(dirname, "rotated.key")
+            with open(rotated, "wb") as f:
+                f.write(new_key + b"\n" + old_key)
+            os.chmod(rotated, stat.S_IRUSR | stat.S_IWUSR)
+            os.replace(rotated, key_file)
+            os.utime(key_file, (past, past))
+            first.check_interval = 0
+            self.assertEqual(first.decrypt(new_value), "new-secret")
+            self.assertEqual(first.decrypt(old_value), "old-secret")
+            second.check_interval = 0
+            self.assertIs(first._load_keys(), second._load_keys())
+
+    def test_key_policy(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            key_file = os.path.join(dirname, "secret.key")
+            with open(key_file, "wb") as f:
+                f.write(Fernet.generate_key())
+            os.chmod(key_file, 0o644)
+            # A key file that fails the policy is never parsed (or shared).
+            with mock.patch("cconf.ciphers.read_keys") as read_keys:
+                with self.assertRaises(PolicyError):
+                    KeyFile(key_file).encrypt("secret")
+                read_keys.assert_not_called()
+            # Another KeyFile with a laxer policy may still use it, but that doesn't
+            # let the stricter one use the parsed keys.
+            self.assertTrue(KeyFile(key_file, policy=None).encrypt("secret"))
+            with self.assertRaises(PolicyError):
+                KeyFile(key_file).encrypt("secret")
+
+    def test_prefixed(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            env_dir = os.path.join(dirname, "envdir")
+            os.mkdir(env_dir)
+            for name, value in [("CELERY_CONCURRENCY", "4"), ("CELERYD_X", "1")]:
+                with open(os.path.join(env_dir, name), "w") as f:
+                    f.write(value)
+            env_file = os.path.join(dirname, "env")
+            with open(env_file, "w") as f:
+                f.write("CELERY_CONCURRENCY=8\nCELERY_TIMEOUT=30\nOTHER=1\n")
+            config = Config(
+                {"CELERY_RETRIES": "3", "CELERY": "x"},
+                EnvDir(env_dir),
+                EnvFile(env_file),
+            )
+            self.assertEqual(
+                config.prefixed("CELERY_", cast=int),
+                {"CELERY_CONCURRENCY": 4, "CELERY_RETRIES": 3, "CELERY_TIMEOUT": 30},
+            )
+            self.assertEqual(config.defined["CELERY_TIMEOUT"], 30)
+            self.assertEqual(config.prefixed("NOPE_"), {})
+            self.assertEqual(
+                sorted(EnvDir(env_dir).items()),
+                [("CELERYD_X", "1"), ("CELERY_CONCURRENCY", "4")],
+            )
+            self.assertEqual(list(EnvFile(env_dir).keys()), [])
+
+    def test_override(self):
+        config = Config({"HOSTNAME": "example.com", "DEBUG": "false"})
+        self.assertFalse(config("DEBUG", cast=bool))
+        with config.override({"DEBUG": "true"}, PORT=8080):
+            self.assertTrue(config("DEBUG", cast=bool))
+            self.assertEqual(config("PORT", cast=int), 8080)
+            self.assertEqual(config("HOSTNAME"), "example.com")
+            with config.override(HOSTNAME="nested.com"):
+                self.assertEqual(config("HOSTNAME"), "nested.com")
+                self.assertTrue(config("DEBUG", cast=bool))
+                self.assertEqual(config.prefixed("HOST"), {"HOSTNAME": "nested.com"})
+            self.assertEqual(config("HOSTNAME"), "example.com")
+            self.assertEqual(config.defined["PORT"], 8080)
+            # Other threads don't see the override.
+            seen = []
+            thread = threading.Thread(target=lambda: seen.append(config("DEBUG")))
+            thread.start()
+            thread.join()
+            self.assertEqual(seen, ["false"])
+        self.assertFalse(config("DEBUG", cast=bool))
+        self.assertNotIn("PORT", config.defined)
+        self.assertEqual(config._defined["DEBUG"].value, False)
+
+    def test_override_tasks(self):
+        config = Config({"TENANT": "default"})
+
+        async def tenant(name):
+            with config.override(TENANT=name):
+                await asyncio.sleep(0)
+                return config("TENANT")
+
+        async def main():
+            return await asyncio.gather(*(tenant(name) for name in "abc"))
+
+        self.assertEqual(asyncio.run(main()), ["a", "b", "c"])
+        self.assertEqual(config("TENANT"), "default")
+
+    def test_bench(self):
+        key = Fernet.generate_key()
+        token = Fernet(key).encrypt(b"hunter2").decode()
+        environ = {"PORT": "9090", "PASSWORD": token}
+        config = Config({"PORT": "8080"}, environ, keys=[key])
+        config("PORT", cast=int)
+        config("PASSWORD", sensitive=True)
+        with mock.patch("cconf.cli.log") as log:
+            with mock.patch("cconf.cli.importlib.import_module") as import_module:
+                import_module.return_value.config = config
+                main("bench", "-n", "10")
+        results = json.loads(log.call_args.args[0])
+        self.assertEqual(results["iterations"], 10)
+        self.assertEqual(results["keys"], 2)
+        first, second = results["sources"]
+        self.assertEqual(first["lookup"]["count"], 20)
+        self.assertEqual(first["decrypt"]["count"], 0)
+        self.assertEqual(first["cast"]["count"], 10)
+        self.assertEqual(second["decrypt"]["count"], 10)
+        self.assertEqual(second["cast"]["count"], 20)
+        for phase in ("lookup", "decrypt", "cast"):
+            self.assertLessEqual(second[phase]["p50_us"], second[phase]["p99_us"])
+            self.assertIn("peak_bytes", second[phase])
+
+    def test_reload(self):
+        key = Fernet.generate_key()
+        old, new = (Fernet(key).encrypt(v).decode() for v in (b"a", b"b"))
+        with tempfile.TemporaryDirectory() as dirname:
+            envfile = os.path.join(dirname, "env")
+            with open(envfile, "w") as f:
+                f.write(f"PORT=8080\nHOSTNAME=example.com\nPASSWORD={old}\nREMOVED=1\n")
+            config = Config(EnvFile(envfile, keys=[key]))
+            config("PORT", cast=int)
+            config("HOSTNAME")
+            config("PASSWORD", sensitive=True)
+            config("REMOVED")
+            config("DEBUG", "false", cast=bool)
+            self.assertEqual(config.reload(), {})
+            with open(envfile, "w") as f:
+                f.write(
+                    f"PORT=9090\nHOSTNAME=example.com\nPASSWORD={new}\nDEBUG=true\n"
+                )
+            hostname = config._defined["HOSTNAME"]
+            with mock.patch.object(
+                config, "_perform_cast", wraps=config._perform_cast
+            ) as cast:
+                changes = config.reload()
+            self.assertEqual(
+                changes,
+                {
+                    "PORT": (8080, 9090),
+                    "PASSWORD": ("a", "b"),
+                    "DEBUG": (False, True),
+                    "REMOVED": ("1", undefined),
+                },
+            )
+            # Only changed values were cast again.
+            self.assertEqual(cast.call_count, 3)
+            self.assertIs(config._defined["HOSTNAME"], hostname)
+            self.assertNotIn("REMOVED", config.defined)
+            self.assertEqual(config.defined["PORT"], 9090)
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from cryptography.fernet import Fernet
+
+from cconf import Config, ConfigWarning, EnvFile, SocketSource
+from cconf.ciphers import DecryptError
+from cconf.daemon import OP_ALL, ConfigServer
+
+
+class SocketSourceTests(unittest.TestCase):
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.dirname = tempdir.name
+        self.path = os.path.join(self.dirname, "cconf.sock")
+        self.key = Fernet.generate_key()
+        fernet = Fernet(self.key)
+        self.password = fernet.encrypt(b"hunter2").decode()
+        self.api_key = fernet.encrypt(b"sekrit").decode()
+        env_file = os.path.join(self.dirname, "env")
+        with open(env_file, "w") as f:
+            f.write(
+                f"HOSTNAME=example.com\nPORT=8080\nPASSWORD={self.password}\n"
+                f"API_KEY={self.api_key}\nEXTRA=later\n"
+            )
+        self.config = Config(EnvFile(env_file, keys=[self.key]))
+        self.config("HOSTNAME")
+        self.config("PORT", cast=int)
+        self.config("PASSWORD", sensitive=True)
+        self.config("DEBUG", "false")
+
+    def serve(self, **kwargs):
+        server = ConfigServer(self.path, self.config, **kwargs)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def make_source(self, **kwargs):
+        source = SocketSource(self.path, **kwargs)
+        self.addCleanup(source.close)
+        return source
+
+    def test_lookup(self):
+        self.serve()
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+        source = self.make_source()
+        config = Config(source)
+        with mock.patch.object(source, "_call", wraps=source._call) as call:
+            self.assertEqual(config("HOSTNAME"), "example.com")
+            self.assertEqual(config("PORT", cast=int), 8080)
+            self.assertEqual(config("PASSWORD", sensitive=True), "hunter2")
+            # Everything the daemon resolved came back in one round-trip.
+            self.assertEqual(call.call_count, 1)
+            self.assertEqual(call.call_args.args[0], [(OP_ALL, b"")])
+        # Defaults are not served.
+        self.assertEqual(config("DEBUG", "true"), "true")
+        # Keys the daemon hasn't resolved are looked up, and decrypted, individually.
+        self.assertEqual(config("EXTRA"), "later")
+        self.assertEqual(config("API_KEY", sensitive=True), "sekrit")
+        self.assertEqual(
+            source.get_many(["EXTRA", "MISSING", "HOSTNAME"]),
+            {"EXTRA": "later", "HOSTNAME": "example.com"},
+        )
+        # A ttl is checked by the daemon.
+        self.assertEqual(config("PASSWORD", sensitive=True, ttl=60), "hunter2")
+        # Plaintext values can't be used as sensitive values.
+        with self.assertRaises(DecryptError):
+            source.decrypt(source["HOSTNAME"])
+        with self.assertRaises(DecryptError):
+            source.decrypt(Fernet(self.key).encrypt(b"forged").decode())
+
+    def test_reconnect(self):
+        server = self.serve()
+        source = self.make_source()
+        self.assertEqual(source["EXTRA"], "later")
+        server.shutdown()
+        server.server_close()
+        source._sock.shutdown(2)
+        self.serve()
+        self.assertEqual(source["PORT"], "8080")
+
+    def test_untrusted(self):
+        self.serve(trusted_uids=[os.getuid() + 1])
+        config = Config(self.make_source(), {"HOSTNAME": "fallback"})
+        with self.assertWarns(ConfigWarning):
+            self.assertEqual(config("HOSTNAME"), "fallback")
+        # Clients check the daemon, too.
+        os.unlink(self.path)
+        self.serve()
+        source = self.make_source(trusted_uids=[os.getuid() + 1])
+        with self.assertWarns(ConfigWarning):
+            self.assertEqual(Config(source, {"PORT": "1"})("PORT"), "1")
+
+    def test_not_running(self):
+        config = Config(self.make_source(), {"HOSTNAME": "fallback"})
+        with self.assertWarns(ConfigWarning):
+            self.assertEqual(config("HOSTNAME"), "fallback")
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import threading
+import time
+import unittest
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from cryptography.fernet import Fernet
+
+from cconf import Config, ConfigWarning, HttpKVSource
+
+
+class KVServer(ThreadingHTTPServer):
+    """
+    A local stand-in for an HTTP key/value store, serving `values` as a JSON object.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), KVHandler)
+        self.values = {}
+        self.status = None
+        self.requests = []
+        self.changed = threading.Condition()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/kv"
+
+    @property
+    def etag(self):
+        body = json.dumps(self.values, sort_keys=True).encode()
+        return '"{}"'.format(hashlib.sha256(body).hexdigest()[:16])
+
+    def update(self, **values):
+        with self.changed:
+            self.values.update(values)
+            self.changed.notify_all()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class KVHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: KVServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        etag = self.headers.get("If-None-Match")
+        self.server.requests.append((self.path, etag, self.client_address))
+        if self.server.status is not None:
+            self.send_response(self.server.status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if "wait" in query and etag == self.server.etag:
+            wait = float(query["wait"][0].rstrip("s"))
+            with self.server.changed:
+                self.server.changed.wait_for(lambda: etag != self.server.etag, wait)
+        if etag == self.server.etag:
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps(self.server.values).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", self.server.etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class HttpKVSourceTests(unittest.TestCase):
+    def setUp(self):
+        self.server = KVServer()
+        self.addCleanup(self.server.stop)
+
+    def make_source(self, **kwargs):
+        source = HttpKVSource(self.server.url, **kwargs)
+        self.addCleanup(source.close)
+        return source
+
+    def test_bulk_fetch(self):
+        key = Fernet.generate_key()
+        token = Fernet(key).encrypt(b"hunter2").decode()
+        self.server.update(HOSTNAME="example.com", PORT=8080, PASSWORD=token)
+        config = Config(self.make_source(keys=[key]))
+        self.assertEqual(config("HOSTNAME"), "example.com")
+        self.assertEqual(config("PORT", cast=int), 8080)
+        self.assertEqual(config("PASSWORD", sensitive=True), "hunter2")
+        with self.assertRaises(KeyError):
+            config("MISSING")
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_revalidation(self):
+        self.server.update(HOSTNAME="example.com")
+        source = self.make_source(refresh_interval=0)
+        self.assertEqual(source["HOSTNAME"], "example.com")
+        self.assertEqual(source["HOSTNAME"], "example.com")
+        self.server.update(HOSTNAME="changed.com")
+        self.assertEqual(source["HOSTNAME"], "changed.com")
+        etags = [etag for _, etag, _ in self.server.requests]
+        self.assertIsNone(etags[0])
+        self.assertEqual(len(set(etags[1:])), 1)
+        # Every request reused the same pooled connection.
+        self.assertEqual(len({client for _, _, client in self.server.requests}), 1)
+
+    def test_watch(self):
+        self.server.update(FLAG="off")
+        source = self.make_source(watch=True, wait=5)
+        self.assertEqual(source["FLAG"], "off")
+        self.server.update(FLAG="on")
+        deadline = time.monotonic() + 5
+        while source["FLAG"] != "on" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(source["FLAG"], "on")
+        self.assertTrue(any("wait=5s" in path for path, _, _ in self.server.requests))
+
+    def test_unavailable(self):
+        self.server.stop()
+        config = Config(self.make_source(timeout=1), {"HOSTNAME": "fallback"})
+        with self.assertWarns(ConfigWarning):
+            self.assertEqual(config("HOSTNAME"), "fallback")
+
+    def test_failed_revalidation(self):
+        self.server.update(HOSTNAME="example.com")
+        source = self.make_source(refresh_interval=0, retry_interval=30)
+        config = Config(source, {"HOSTNAME": "fallback"})
+        self.assertEqual(config("HOSTNAME"), "example.com")
+        self.server.status = 503
+        # The last known values are served, warning once, and revalidation backs off.
+        with self.assertWarns(ConfigWarning):
+            self.assertEqual(source["HOSTNAME"], "example.com")
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            self.assertEqual(source["HOSTNAME"], "example.com")
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertFalse(source.remote)
+        # Once the retry interval has passed, revalidation is attempted again.
+        source._retry_at = time.monotonic()
+        self.server.status = None
+        self.server.update(HOSTNAME="changed.com")
+        self.assertEqual(source["HOSTNAME"], "changed.com")
+        self.assertEqual(len(self.server.requests), 3)
@@ -0,0 +1,130 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from cconf import Config, ConfigError, RefreshingSource
+from cconf.cli import main
+from cconf.manifest import Manifest
+from cconf.sources import BaseSource
+
+
+class SlowSource(BaseSource):
+    """
+    A source whose lookups block until `expected` of them are waiting at once.
+    """
+
+    def __init__(self, name, expected=1, **values):
+        self.name = name
+        self.values = values
+        self.calls = []
+        self.barrier = threading.Barrier(expected, timeout=5)
+
+    def __str__(self):
+        return f"SlowSource({self.name})"
+
+    def __getitem__(self, key):
+        self.calls.append(key)
+        self.barrier.wait()
+        return self.values[key]
+
+    def decrypt(self, value, ttl=None):
+        return value
+
+
+class ManifestTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.manifest = os.path.join(self.tempdir.name, "manifest.json")
+
+    def make_config(self, expected=1):
+        secrets = RefreshingSource(
+            SlowSource("secrets", expected, TOKEN="t", PASSWORD="p"), ttl=60
+        )
+        other = RefreshingSource(SlowSource("other", expected, API_KEY="k"), ttl=60)
+        self.addCleanup(secrets.close)
+        self.addCleanup(other.close)
+        return Config({"DEBUG": "true"}, secrets, other)
+
+    def resolve(self, config):
+        config("DEBUG")
+        config("TOKEN")
+        config("PASSWORD", sensitive=True)
+        config("API_KEY")
+        config("MISSING", "default")
+
+    def test_record(self):
+        config = self.make_config()
+        self.resolve(config)
+        with mock.patch("cconf.cli.log"):
+            with mock.patch("cconf.cli.importlib.import_module") as import_module:
+                import_module.return_value.config = config
+                main("-q", "manifest", "-o", self.manifest)
+        with open(self.manifest) as f:
+            recorded = json.load(f)
+        self.assertEqual(
+            recorded["sources"],
+            [
+                {"name": "Source", "keys": ["DEBUG"]},
+                {
+                    "name": "RefreshingSource(SlowSource(secrets))",
+                    "keys": ["TOKEN", "PASSWORD"],
+                },
+                {"name": "RefreshingSource(SlowSource(other))", "keys": ["API_KEY"]},
+            ],
+        )
+        self.assertEqual(recorded["missing"], ["MISSING"])
+        self.assertEqual(len(Manifest.read(self.manifest)), 5)
+
+    def test_prefetch(self):
+        config = self.make_config()
+        self.resolve(config)
+        Manifest.record(config).write(self.manifest)
+        # Each source fetches its keys at once (along with the keys it was checked for
+        # but didn't have), so its lookups only finish once all of them are waiting.
+        config = self.make_config(expected=4)
+        config._sources[2]._inner.barrier = threading.Barrier(2, timeout=5)
+        config.prefetch(self.manifest)
+        secrets, other = config._sources[1]._inner, config._sources[2]._inner
+        self.assertEqual(
+            sorted(secrets.calls), ["API_KEY", "MISSING", "PASSWORD", "TOKEN"]
+        )
+        self.assertEqual(sorted(other.calls), ["API_KEY", "MISSING"])
+        self.resolve(config)
+        self.assertEqual(len(secrets.calls), 4)
+        self.assertEqual(len(other.calls), 2)
+        self.assertEqual(len(config.diagnostics), 0)
+
+    def test_failures(self):
+        config = self.make_config()
+        config.diagnostics.action = "collect"
+        # A missing manifest is ignored.
+        config.prefetch(self.manifest)
+        self.assertEqual(len(config.diagnostics), 0)
+        with open(self.manifest, "w") as f:
+            f.write("not json")
+        config.prefetch(self.manifest)
+        self.assertEqual(config.diagnostics.report()[0]["kind"], "prefetch")
+        with self.assertRaises(ConfigError):
+            Manifest.read(self.manifest)
+        # Manifests recorded for other sources are not used.
+        Manifest([{"name": "Source", "keys": ["DEBUG"]}], []).write(self.manifest)
+        config.diagnostics.clear()
+        config.prefetch(self.manifest)
+        self.assertEqual(len(config.diagnostics), 1)
+        # Failing sources are reported, and don't stop other sources prefetching.
+        self.resolve(config)
+        Manifest.record(config).write(self.manifest)
+        config = self.make_config()
+        config.diagnostics.action = "collect"
+        with mock.patch.object(
+            config._sources[1], "prefetch", side_effect=ConfigError("down")
+        ):
+            config.prefetch(self.manifest)
+        other = config._sources[2]._inner
+        self.assertEqual(sorted(other.calls), ["API_KEY", "MISSING"])
+        [issue] = config.diagnostics.report()
+        self.assertEqual(issue["source"], "RefreshingSource(SlowSource(secrets))")
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from cryptography.fernet import Fernet
+
+from cconf import Config, ConfigError, ConfigWarning, PackedSource
+from cconf.cli import main
+from cconf.packed import HEADER, MAGIC, SLOT, VERSION, pack_entries, write_packed
+
+
+class PackedSourceTests(unittest.TestCase):
+    def test_lookup(self):
+        entries = {f"FEATURE_{i}": f"value-{i}" for i in range(1000)}
+        entries["UNICODE"] = "café"
+        entries["EMPTY"] = ""
+        with tempfile.TemporaryDirectory() as dirname:
+            packed = os.path.join(dirname, "flags.pack")
+            write_packed(packed, entries)
+            source = PackedSource(packed)
+            for key, value in entries.items():
+                self.assertEqual(source[key], value)
+            for key in ("FEATURE_1000", "feature_1", ""):
+                with self.assertRaises(KeyError):
+                    source[key]
+
+    def test_cli(self):
+        key = Fernet.generate_key()
+        token = Fernet(key).encrypt(b"hunter2").decode()
+        with tempfile.TemporaryDirectory() as dirname:
+            first, second = os.path.join(dirname, "a"), os.path.join(dirname, "b")
+            with open(first, "w") as f:
+                f.write(f"# comment\nHOSTNAME=first\nPASSWORD='{token}'\n")
+            with open(second, "w") as f:
+                f.write("HOSTNAME=second\nDEBUG=true\n")
+            packed = os.path.join(dirname, "env.pack")
+            main("-q", "pack", first, second, "-o", packed)
+            config = Config(PackedSource(packed, keys=[key]))
+            self.assertEqual(config("HOSTNAME"), "second")
+            self.assertTrue(config("DEBUG", cast=bool))
+            self.assertEqual(config("PASSWORD", sensitive=True), "hunter2")
+
+    def test_invalid(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            packed = os.path.join(dirname, "env.pack")
+            with open(packed, "w") as f:
+                f.write("HOSTNAME=example.com\n")
+            config = Config(PackedSource(packed))
+            with self.assertWarns(ConfigWarning):
+                self.assertEqual(config("HOSTNAME", "default"), "default")
+            config = Config(PackedSource(os.path.join(dirname, "missing")))
+            self.assertEqual(config("HOSTNAME", "default"), "default")
+
+    def test_corrupt(self):
+        packed = pack_entries({"HOSTNAME": "example.com"})
+        # A header claiming an empty index, with every slot filled.
+        offset = HEADER.size + SLOT.size * 8
+        full = HEADER.pack(MAGIC, VERSION, 0, 8) + SLOT.pack(1, offset, 1, 0, 0) * 8
+        cases = {
+            "empty": b"",
+            "truncated": packed[: HEADER.size + SLOT.size],
+            "slots": HEADER.pack(MAGIC, VERSION, 0, 6) + packed[HEADER.size :],
+            "full": full + b"X",
+        }
+        with tempfile.TemporaryDirectory() as dirname:
+            for name, data in cases.items():
+                with self.subTest(name):
+                    path = os.path.join(dirname, name)
+                    with open(path, "wb") as f:
+                        f.write(data)
+                    source = PackedSource(path)
+                    if name == "full":
+                        with self.assertRaises(KeyError):
+                            source["HOSTNAME"]
+                    else:
+                        with self.assertRaises(ConfigError):
+                            source["HOSTNAME"]
+
+    def test_reload_threaded(self):
+        small = {"HOSTNAME": "example.com"}
+        large = {**small, **{f"FEATURE_{i}": str(i) for i in range(100)}}
+        with tempfile.TemporaryDirectory() as dirname:
+            packed = os.path.join(dirname, "env.pack")
+            write_packed(packed, small)
+            source = PackedSource(packed)
+            errors = []
+            done = threading.Event()
+
+            def lookup():
+                while not done.is_set():
+                    try:
+                        self.assertEqual(source["HOSTNAME"], "example.com")
+                    except Exception as ex:
+                        errors.append(ex)
+                        return
+
+            threads = [threading.Thread(target=lookup) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            # Reloading between files with different index sizes never pairs one
+            # file's index with the other's data.
+            for i in range(200):
+                write_packed(packed, large if i % 2 else small)
+                source.reload()
+            done.set()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(errors, [])
@@ -0,0 +1,114 @@
+import threading
+import unittest
+from unittest import mock
+
+from cconf import Config, ConfigError, RefreshingSource, refreshing
+from cconf.sources import BaseSource
+
+
+class FlakySource(BaseSource):
+    def __init__(self, **values):
+        self.values = values
+        self.calls = 0
+        self.failing = False
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __getitem__(self, key):
+        self.calls += 1
+        self.gate.wait()
+        if self.failing:
+            raise ConfigError("Source is down.")
+        return self.values[key]
+
+    def decrypt(self, value, ttl=None):
+        return value
+
+
+class RefreshingSourceTests(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(refreshing, "time")
+        self.addCleanup(patcher.stop)
+        patcher.start().monotonic.side_effect = lambda: self.now
+
+    def make_source(self, inner, **kwargs):
+        source = RefreshingSource(inner, **kwargs)
+        self.addCleanup(source.close)
+        return source
+
+    def settle(self, source):
+        # Wait for any background refreshes to finish.
+        if source._executor is not None:
+            source._executor.submit(lambda: None).result()
+        source.close()
+
+    def test_cache(self):
+        inner = FlakySource(TOKEN="a")
+        source = self.make_source(inner, ttl=60, stale_ttl=60)
+        config = Config(source)
+        self.assertEqual(config("TOKEN", sensitive=True), "a")
+        with self.assertRaises(KeyError):
+            config("MISSING")
+        self.assertEqual(config("TOKEN"), "a")
+        with self.assertRaises(KeyError):
+            config("MISSING")
+        self.assertEqual(inner.calls, 2)
+
+    def test_background_refresh(self):
+        inner = FlakySource(TOKEN="a")
+        source = self.make_source(inner, ttl=60, stale_ttl=60)
+        self.assertEqual(source["TOKEN"], "a")
+        inner.values["TOKEN"] = "b"
+        # Close to expiring: the cached value is returned, and refreshed.
+        self.now += 50
+        self.assertEqual(source["TOKEN"], "a")
+        self.settle(source)
+        self.assertEqual(source["TOKEN"], "b")
+        self.assertEqual(inner.calls, 2)
+        # Past the stale window, values are fetched before returning.
+        inner.values["TOKEN"] = "c"
+        self.now += 200
+        self.assertEqual(source["TOKEN"], "c")
+
+    def test_serve_stale_on_failure(self):
+        inner = FlakySource(TOKEN="a")
+        source = self.make_source(inner, ttl=60, stale_ttl=60, retry_interval=10)
+        self.assertEqual(source["TOKEN"], "a")
+        inner.failing = True
+        self.now += 70
+        self.assertEqual(source["TOKEN"], "a")
+        self.settle(source)
+        self.now += 100
+        self.assertEqual(source["TOKEN"], "a")
+        calls = inner.calls
+        # Failed refreshes are not retried until retry_interval has passed.
+        self.assertEqual(source["TOKEN"], "a")
+        self.assertEqual(inner.calls, calls)
+        self.now += 10
+        inner.failing = False
+        inner.values["TOKEN"] = "b"
+        self.assertEqual(source["TOKEN"], "b")
+        # Without a cached value, errors are raised as usual.
+        inner.failing = True
+        with self.assertRaises(ConfigError):
+            source["OTHER"]
+
+    def test_dedupe(self):
+        inner = FlakySource(TOKEN="a")
+        inner.gate.clear()
+        source = self.make_source(inner, ttl=60)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(source["TOKEN"]))
+            for _ in range(16)
+        ]
+        for t in threads:
+            t.start()
+        while not source._inflight:
+            pass
+        inner.gate.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, ["a"] * 16)
+        self.assertEqual(inner.calls, 1)
@@ -0,0 +1,184 @@
+import unittest
+from concurrent.futures import CancelledError
+from unittest import mock
+
+from cconf import Config, ConfigError, Schema, SourceUnavailable, resilience
+from cconf.resilience import Backoff, CircuitBreaker, call
+from cconf.sources import BaseSource
+
+
+class RemoteSource(BaseSource):
+    remote = True
+
+    def __init__(self, **values):
+        self.values = values
+        self.calls = 0
+
+    def __getitem__(self, key):
+        self.calls += 1
+        return self.values[key]
+
+    def decrypt(self, value, ttl=None):
+        return value
+
+
+class ResilienceTests(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(resilience, "time")
+        self.addCleanup(patcher.stop)
+        self.time = patcher.start()
+        self.time.monotonic.side_effect = lambda: self.now
+        self.time.sleep.side_effect = self.sleep
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def test_backoff(self):
+        delays = list(Backoff(retries=5, base=0.5, cap=3.0).delays())
+        self.assertEqual(len(delays), 5)
+        for delay, limit in zip(delays, [0.5, 1.0, 2.0, 3.0, 3.0]):
+            self.assertTrue(0 <= delay <= limit)
+
+    def test_retry(self):
+        attempts = []
+
+        def flaky():
+            attempts.append(self.now)
+            if len(attempts) < 3:
+                raise OSError("connection refused")
+            return "ok"
+
+        self.assertEqual(call(flaky, retry_on=(OSError,), backoff=Backoff()), "ok")
+        self.assertEqual(len(attempts), 3)
+        attempts.clear()
+        with self.assertRaises(SourceUnavailable):
+            call(flaky, retry_on=(OSError,), backoff=Backoff(retries=1), name="src")
+        self.assertEqual(len(attempts), 2)
+        # Other errors are not retried.
+        attempts.clear()
+        with self.assertRaises(OSError):
+            call(flaky, retry_on=(ValueError,), backoff=Backoff())
+        self.assertEqual(len(attempts), 1)
+
+    def test_circuit_breaker(self):
+        breaker = CircuitBreaker(threshold=2, reset_timeout=30)
+        failing = mock.Mock(side_effect=OSError("down"))
+        for _ in range(2):
+            with self.assertRaises(SourceUnavailable):
+                call(failing, retry_on=(OSError,), breaker=breaker)
+        self.assertEqual(breaker.state, "open")
+        with self.assertRaises(SourceUnavailable):
+            call(failing, retry_on=(OSError,), breaker=breaker)
+        self.assertEqual(failing.call_count, 2)
+        # After `reset_timeout`, a single trial request is let through.
+        self.now += 30
+        self.assertEqual(breaker.state, "half-open")
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.failure()
+        self.assertEqual(breaker.state, "open")
+        self.now += 30
+        self.assertEqual(call(lambda: "ok", retry_on=(OSError,), breaker=breaker), "ok")
+        self.assertEqual(breaker.state, "closed")
+
+    def test_interrupted(self):
+        breaker = CircuitBreaker(threshold=1, reset_timeout=30)
+        with self.assertRaises(SourceUnavailable):
+            call(
+                mock.Mock(side_effect=OSError("down")),
+                retry_on=(OSError,),
+                breaker=breaker,
+            )
+        self.now += 30
+        # Interrupting (or cancelling) the trial request doesn't close the circuit, but
+        # lets another trial through.
+        for interrupt in (KeyboardInterrupt, CancelledError):
+            with self.assertRaises(interrupt):
+                call(
+                    mock.Mock(side_effect=interrupt),
+                    retry_on=(OSError,),
+                    breaker=breaker,
+                )
+            self.assertEqual(breaker.state, "half-open")
+        # Other errors are a response from the service.
+        with self.assertRaises(ValueError):
+            call(
+                mock.Mock(side_effect=ValueError), retry_on=(OSError,), breaker=breaker
+            )
+        self.assertEqual(breaker.state, "closed")
+
+    def test_messages(self):
+        # Failures are reported for the service, with the error itself as the cause.
+        errors = []
+        for path in ("secrets/a", "secrets/b"):
+            error = OSError(f"{path}: connection refused")
+            with self.assertRaises(SourceUnavailable) as ctx:
+                call(mock.Mock(side_effect=error), retry_on=(OSError,), name="src")
+            self.assertIs(ctx.exception.__cause__, error)
+            errors.append(str(ctx.exception))
+        self.assertEqual(errors, ["src: requests are failing."] * 2)
+
+    def test_deadline(self):
+        remote = RemoteSource(TOKEN="remote", OTHER="remote")
+        config = Config(remote, {"TOKEN": "local"}, diagnostics="collect")
+        with config.deadline(10):
+            self.assertEqual(config("TOKEN"), "remote")
+            self.now += 10
+            self.assertEqual(config("TOKEN"), "local")
+            self.assertEqual(config("OTHER", "default"), "default")
+            # Requests aren't attempted (or retried) past the deadline either.
+            with self.assertRaises(SourceUnavailable):
+                call(mock.Mock(), retry_on=(OSError,))
+        self.assertEqual(remote.calls, 1)
+        [issue] = config.diagnostics.report()
+        self.assertEqual((issue["kind"], issue["count"]), ("unavailable", 2))
+        # Outside the block, remote sources are used as usual.
+        self.assertEqual(config("OTHER"), "remote")
+        with config.deadline(10):
+            with resilience.deadline(60):
+                self.assertEqual(resilience.remaining(), 10)
+        self.assertIsNone(resilience.remaining())
+
+    def test_unavailable(self):
+        class DownSource(RemoteSource):
+            def __getitem__(self, key):
+                raise SourceUnavailable(f"{self}: down")
+
+        config = Config(DownSource(), {"A": "a", "B": "b"}, diagnostics="collect")
+        self.assertEqual(config("A"), "a")
+        self.assertEqual(config("B"), "b")
+        # Reported once for the source, not per key.
+        [issue] = config.diagnostics.report()
+        self.assertEqual((issue["key"], issue["count"]), ("", 2))
+        self.assertTrue(issubclass(SourceUnavailable, ConfigError))
+
+    def test_schema(self):
+        class Settings(Schema):
+            TOKEN: str
+            OTHER: str = "default"
+
+        class DownSource(RemoteSource):
+            def __getitem__(self, key):
+                self.calls += 1
+                raise SourceUnavailable(f"{self}: down")
+
+        # Schemas skip remote sources once the deadline passes, as lookups do.
+        remote = RemoteSource(TOKEN="remote", OTHER="remote")
+        config = Config(remote, {"TOKEN": "local"}, diagnostics="collect")
+        with config.deadline(10):
+            self.now += 10
+            settings = Settings(config)
+        self.assertEqual((settings.TOKEN, settings.OTHER), ("local", "default"))
+        self.assertEqual(remote.calls, 0)
+        [issue] = config.diagnostics.report()
+        self.assertEqual((issue["kind"], issue["key"]), ("unavailable", ""))
+        # And report an unreachable source once, rather than for every field.
+        down = DownSource()
+        config = Config(down, {"TOKEN": "local"}, diagnostics="collect")
+        self.assertEqual(Settings(config).TOKEN, "local")
+        self.assertEqual(down.calls, 1)
+        [issue] = config.diagnostics.report()
+        self.assertEqual(
+            (issue["kind"], issue["key"], issue["count"]), ("unavailable", "", 1)
+        )
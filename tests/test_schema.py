@@ -0,0 +1,90 @@
+import unittest
+from typing import Any, Optional
+
+from cryptography.fernet import Fernet
+
+from cconf import (
+    CommaSeparatedInts,
+    Config,
+    ConfigWarning,
+    DatabaseDict,
+    Field,
+    Schema,
+    SchemaError,
+    Secret,
+    undefined,
+)
+
+
+class Settings(Schema):
+    DEBUG: bool = False
+    HOSTNAME: str
+    PORT: int = 8000
+    TIMEOUT: Optional[int] = None
+    PORTS: list = Field(cast=CommaSeparatedInts, default="")
+    DATABASE: dict = Field(cast=DatabaseDict, key="DATABASE_URL")
+    EXTRA: Any = None
+
+
+class SchemaTests(unittest.TestCase):
+    def test_resolve(self):
+        config = Config(
+            {"HOSTNAME": "example.com", "PORT": "8080"},
+            {"DEBUG": "yes", "PORT": "9090", "DATABASE_URL": "sqlite://"},
+        )
+        settings = Settings(config)
+        self.assertIs(settings.DEBUG, True)
+        self.assertEqual(settings.HOSTNAME, "example.com")
+        self.assertEqual(settings.PORT, 8080)
+        self.assertIsNone(settings.TIMEOUT)
+        self.assertEqual(settings.PORTS, [])
+        self.assertEqual(settings.DATABASE["NAME"], ":memory:")
+        self.assertIsNone(settings.EXTRA)
+        self.assertEqual(config.defined["PORT"], 8080)
+        self.assertIn("DATABASE_URL", config.defined)
+        self.assertFalse(hasattr(settings, "__dict__"))
+        with self.assertRaises(AttributeError):
+            settings.PORT = 1
+
+    def test_override(self):
+        config = Config({"HOSTNAME": "example.com", "PORT": "8080"})
+        with config.override(PORT="9090", DEBUG="true", DATABASE_URL="sqlite://"):
+            settings = Settings(config)
+            self.assertEqual(settings.PORT, 9090)
+            self.assertIs(settings.DEBUG, True)
+            self.assertEqual(settings.HOSTNAME, "example.com")
+        self.assertNotIn("PORT", config.defined)
+
+    def test_errors_reported_together(self):
+        config = Config({"PORT": "eighty", "DEBUG": "maybe"})
+        with self.assertRaises(SchemaError) as ctx:
+            Settings(config)
+        self.assertEqual(
+            set(ctx.exception.errors),
+            {"PORT", "DEBUG", "HOSTNAME", "DATABASE_URL"},
+        )
+        with config.debug(), self.assertWarns(ConfigWarning):
+            settings = Settings(config)
+        self.assertIs(settings.HOSTNAME, undefined)
+
+    def test_sensitive(self):
+        key = Fernet.generate_key()
+        token = Fernet(key).encrypt(b"hunter2").decode()
+
+        class Secrets(Schema):
+            PASSWORD: Secret = Field(sensitive=True, ttl=60)
+            API_KEY: str = Field("dev", sensitive=True)
+
+        config = Config({"PASSWORD": "plaintext"}, {"PASSWORD": token}, keys=[key])
+        with self.assertWarns(ConfigWarning):
+            secrets = Secrets(config)
+        self.assertEqual(secrets.PASSWORD, "hunter2")
+        self.assertEqual(secrets.API_KEY, "dev")
+        self.assertNotIn("hunter2", repr(secrets))
+
+    def test_bad_annotation(self):
+        class Broken(Schema):
+            ITEMS: list[int]
+
+        with self.assertRaises(TypeError):
+            Broken(Config({"ITEMS": "1,2"}))
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from cryptography.fernet import Fernet
+
+from cconf import Config, ConfigError, ConfigWarning, EncryptedEnvFile, Keys
+from cconf.cli import main
+from cconf.sealed import seal, unseal
+
+
+class EncryptedEnvFileTests(unittest.TestCase):
+    def test_lookup(self):
+        keys = Keys([Fernet.generate_key()])
+        with tempfile.TemporaryDirectory() as dirname:
+            sealed = os.path.join(dirname, "env.sealed")
+            with open(sealed, "w") as f:
+                f.write(seal("HOSTNAME=example.com\nPASSWORD=hunter2\n", keys))
+            source = EncryptedEnvFile(sealed, keys=keys)
+            config = Config(source)
+            with mock.patch.object(keys, "decrypt", wraps=keys.decrypt) as decrypt:
+                self.assertEqual(config("HOSTNAME"), "example.com")
+                self.assertEqual(config("PASSWORD", sensitive=True), "hunter2")
+                self.assertEqual(config("PASSWORD", sensitive=True, ttl=60), "hunter2")
+                with self.assertRaises(KeyError):
+                    config("MISSING")
+            # Only the data key is decrypted with `keys`, once.
+            self.assertEqual(decrypt.call_count, 1)
+            self.assertIsNone(source.fingerprint())
+            with mock.patch("cconf.sealed.time.time", return_value=time.time() + 120):
+                with self.assertWarns(ConfigWarning):
+                    config("PASSWORD", "expired", sensitive=True, ttl=60)
+
+    def test_wrong_keys(self):
+        text = "HOSTNAME=example.com\n"
+        sealed = seal(text, Keys([Fernet.generate_key()]))
+        with tempfile.TemporaryDirectory() as dirname:
+            path = os.path.join(dirname, "env.sealed")
+            with open(path, "w") as f:
+                f.write(sealed)
+            config = Config(EncryptedEnvFile(path, keys=[Fernet.generate_key()]))
+            with self.assertWarns(ConfigWarning):
+                self.assertEqual(config("HOSTNAME", "default"), "default")
+            with open(path, "w") as f:
+                f.write(text)
+            config = Config(EncryptedEnvFile(path, keys=[Fernet.generate_key()]))
+            with self.assertWarns(ConfigWarning):
+                self.assertEqual(config("HOSTNAME", "default"), "default")
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            key_file = os.path.join(dirname, "secret.key")
+            main("genkey", "-o", key_file)
+            os.chmod(key_file, 0o600)
+            env_file = os.path.join(dirname, "env")
+            with open(env_file, "w") as f:
+                f.write("HOSTNAME=example.com\nPASSWORD=hunter2\n")
+            sealed = os.path.join(dirname, "env.sealed")
+            main("seal", "-k", key_file, "-o", sealed, env_file)
+            with open(sealed) as f:
+                self.assertNotIn("hunter2", f.read())
+            config = Config(EncryptedEnvFile(sealed, keys=key_file))
+            self.assertEqual(config("PASSWORD", sensitive=True), "hunter2")
+            unsealed = os.path.join(dirname, "env.unsealed")
+            main("unseal", "-k", key_file, "-o", unsealed, sealed)
+            with open(unsealed) as f, open(env_file) as g:
+                self.assertEqual(f.read(), g.read())
+            with open(sealed) as f, open(key_file) as k:
+                self.assertEqual(
+                    unseal(f.read(), Keys([k.read()]))[0],
+                    "HOSTNAME=example.com\nPASSWORD=hunter2\n",
+                )
+            # Single values can't be encrypted for a sealed file.
+            with self.assertRaises(ConfigError):
+                EncryptedEnvFile(sealed, keys=key_file).encrypt("hunter2")
+            with mock.patch("cconf.cli.log") as log:
+                with mock.patch("cconf.cli.importlib.import_module") as import_module:
+                    import_module.return_value.config = config
+                    main("-c", "settings", "encrypt", "hunter2")
+            self.assertNotIn("hunter2", str(log.call_args_list))
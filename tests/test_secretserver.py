@@ -0,0 +1,156 @@
+import json
+import threading
+import unittest
+from unittest import mock
+
+from delinea.secrets.server import SecretServer, SecretServerClientError
+
+from cconf import Config, ConfigError
+from cconf.contrib.secretserver import SecretServerSource
+from cconf.resilience import Backoff, CircuitBreaker
+
+
+def make_secret(name, **fields):
+    return {
+        "name": name,
+        "items": [
+            {"fieldName": field, "itemValue": value, "isPassword": field == "password"}
+            for field, value in fields.items()
+        ],
+    }
+
+
+class SecretServerTests(unittest.TestCase):
+    def setUp(self):
+        self.secrets = {
+            "DB": make_secret("DB", username="dbuser", password="dbpass"),
+            "API_KEY": make_secret("API_KEY", password="apikey"),
+        }
+        self.ss = mock.MagicMock(spec=SecretServer)
+        self.ss.get_secret_by_path.side_effect = self.get_secret_by_path
+
+    def get_secret_by_path(self, path):
+        name = path.rsplit("\\", 1)[-1]
+        if name not in self.secrets:
+            raise SecretServerClientError(f"Secret not found: {name}")
+        return self.secrets[name]
+
+    def test_lookup(self):
+        config = Config(SecretServerSource(self.ss, prefix=["Apps", "MyApp"]))
+        self.assertEqual(config("DB", sensitive=True), "dbpass")
+        self.ss.get_secret_by_path.assert_called_with("Apps\\MyApp\\DB")
+        config = Config(SecretServerSource(self.ss, field="username"))
+        self.assertEqual(config("DB"), "dbuser")
+
+    def test_prefetch(self):
+        source = SecretServerSource(self.ss)
+        source.prefetch(["DB", "API_KEY"])
+        self.assertEqual(self.ss.get_secret_by_path.call_count, 2)
+        config = Config(source)
+        self.assertEqual(config("DB", sensitive=True), "dbpass")
+        self.assertEqual(config("API_KEY", sensitive=True), "apikey")
+        self.assertEqual(self.ss.get_secret_by_path.call_count, 2)
+        # Prefetched secrets are only used once.
+        self.assertEqual(source["DB"], "dbpass")
+        self.assertEqual(self.ss.get_secret_by_path.call_count, 3)
+        # Secrets that don't exist are cached too, so keys served by later sources
+        # aren't requested again.
+        self.ss.get_secret_by_path.reset_mock()
+        source.prefetch(["DB", "OTHER", "OTHER2"])
+        self.assertEqual(self.ss.get_secret_by_path.call_count, 3)
+        config = Config(source, {"OTHER": "a", "OTHER2": "b"}, diagnostics="collect")
+        self.assertEqual(config("DB", sensitive=True), "dbpass")
+        self.assertEqual(config("OTHER"), "a")
+        self.assertEqual(config("OTHER2"), "b")
+        self.assertEqual(self.ss.get_secret_by_path.call_count, 3)
+
+    def test_fields(self):
+        source = SecretServerSource(self.ss, separator="__")
+        config = Config(source)
+        self.assertEqual(config("DB__username"), "dbuser")
+        self.assertEqual(config("DB__password", sensitive=True), "dbpass")
+        self.assertEqual(config("DB", sensitive=True), "dbpass")
+        with self.assertRaises(KeyError):
+            config("DB__host")
+        self.ss.get_secret_by_path.assert_called_once_with("DB")
+        # Missing secrets are only requested once, too.
+        self.ss.get_secret_by_path.reset_mock()
+        for _ in range(2):
+            with self.assertRaises(ConfigError):
+                source["MISSING__username"]
+        self.ss.get_secret_by_path.assert_called_once_with("MISSING")
+        # Prefetching fetches each secret once, for all of its fields.
+        source.reload()
+        source.prefetch(["DB__username", "DB__password", "API_KEY"])
+        self.assertEqual(self.ss.get_secret_by_path.call_count, 3)
+        self.assertEqual(source["DB__username"], "dbuser")
+        self.assertEqual(source["API_KEY"], "apikey")
+        self.assertEqual(self.ss.get_secret_by_path.call_count, 3)
+
+    def test_fields_threaded(self):
+        gate = threading.Event()
+
+        def get_secret_by_path(path):
+            gate.wait(5)
+            return self.get_secret_by_path(path)
+
+        self.ss.get_secret_by_path.side_effect = get_secret_by_path
+        source = SecretServerSource(self.ss, separator="__")
+        results = {}
+
+        def lookup(key):
+            results[key] = source[key]
+
+        threads = [
+            threading.Thread(target=lookup, args=(key,))
+            for key in ("DB__username", "DB__password", "DB__username")
+        ]
+        for thread in threads:
+            thread.start()
+        gate.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, {"DB__username": "dbuser", "DB__password": "dbpass"})
+        self.assertEqual(self.ss.get_secret_by_path.call_count, 1)
+
+    def test_unavailable(self):
+        gate = threading.Event()
+        self.addCleanup(gate.set)
+
+        def get_secret_by_path(path):
+            gate.wait(5)
+            return self.get_secret_by_path(path)
+
+        self.ss.get_secret_by_path.side_effect = get_secret_by_path
+        source = SecretServerSource(
+            self.ss,
+            timeout=0.01,
+            backoff=Backoff(retries=1, base=0.01),
+            breaker=CircuitBreaker(threshold=2),
+        )
+        self.addCleanup(source.close)
+        config = Config(source, {"DB": "fallback", "API_KEY": "fallback"})
+        config.diagnostics.action = "collect"
+        self.assertEqual(config("DB"), "fallback")
+        self.assertEqual(config("API_KEY"), "fallback")
+        self.assertEqual(self.ss.get_secret_by_path.call_count, 4)
+        # The circuit is now open, so lookups fall through without any requests.
+        self.assertEqual(config("DB"), "fallback")
+        self.assertEqual(self.ss.get_secret_by_path.call_count, 4)
+        self.assertEqual(
+            {issue["kind"] for issue in config.diagnostics.report()}, {"unavailable"}
+        )
+
+    def test_keys(self):
+        self.ss.get_folder_by_path.return_value = {"id": 12}
+        pages = [
+            {"records": [{"name": "DB_PRIMARY"}], "hasNext": True},
+            {"records": [{"name": "DB_REPLICA"}, {"name": "OTHER"}], "hasNext": False},
+        ]
+        self.ss.search_secrets.side_effect = [json.dumps(page) for page in pages]
+        source = SecretServerSource(self.ss, prefix=["Apps", "MyApp"])
+        self.assertEqual(list(source.keys()), ["DB_PRIMARY", "DB_REPLICA", "OTHER"])
+        self.ss.get_folder_by_path.assert_called_once_with("Apps\\MyApp")
+        self.ss.search_secrets.assert_called_with(
+            {"filter.folderId": 12, "skip": 1, "take": 500}
+        )
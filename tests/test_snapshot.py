@@ -0,0 +1,97 @@
+import os
+import stat
+import tempfile
+import unittest
+from unittest import mock
+
+from cryptography.fernet import Fernet
+
+from cconf import Config, ConfigWarning, EnvDir, EnvFile, sources
+from cconf.cli import main
+
+
+class SnapshotTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.dirname = self.tempdir.name
+        self.key = Fernet.generate_key()
+        self.key_file = os.path.join(self.dirname, "secret.key")
+        with open(self.key_file, "wb") as f:
+            f.write(self.key)
+        os.chmod(self.key_file, stat.S_IRUSR | stat.S_IWUSR)
+        self.env_dir = os.path.join(self.dirname, "envdir")
+        os.mkdir(self.env_dir)
+        with open(os.path.join(self.env_dir, "HOSTNAME"), "w") as f:
+            f.write("dirhost")
+        self.env_file = os.path.join(self.dirname, "env")
+        token = Fernet(self.key).encrypt(b"hunter2").decode()
+        with open(self.env_file, "w") as f:
+            f.write(f"HOSTNAME=filehost\nPASSWORD={token}\nPORT=8080\n")
+        self.snapshot = os.path.join(self.dirname, "config.snapshot")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def make_config(self, environ):
+        config = Config(
+            EnvDir(self.env_dir, keys=self.key_file),
+            EnvFile(self.env_file, keys=self.key_file),
+        )
+        config.env(environ)
+        return config
+
+    def resolve(self, config):
+        return {
+            "HOSTNAME": config("HOSTNAME"),
+            "PASSWORD": config("PASSWORD", sensitive=True),
+            "PORT": config("PORT", cast=int),
+            "DEBUG": config("DEBUG", False, cast=bool),
+        }
+
+    def test_compile(self):
+        expected = {
+            "HOSTNAME": "dirhost",
+            "PASSWORD": "hunter2",
+            "PORT": 8080,
+            "DEBUG": True,
+        }
+        config = self.make_config({"DEBUG": "true"})
+        self.assertEqual(self.resolve(config), expected)
+        with mock.patch("cconf.cli.importlib.import_module") as import_module:
+            import_module.return_value.config = config
+            main("-q", "compile", "-o", self.snapshot)
+        with open(self.snapshot, "rb") as f:
+            contents = f.read()
+        self.assertNotIn(b"hunter2", contents)
+        # Values come from the snapshot, but HostEnv is still read live.
+        config = self.make_config({"DEBUG": "false"}).snapshot(self.snapshot)
+        with (
+            mock.patch.object(sources, "read_entries") as reader,
+            mock.patch.object(sources, "safe_open") as opener,
+        ):
+            self.assertEqual(self.resolve(config), {**expected, "DEBUG": False})
+        reader.assert_not_called()
+        opener.assert_not_called()
+        # Keys that weren't compiled are looked up in the sources as usual.
+        self.assertEqual(config("MISSING", "default"), "default")
+        # Changing a source invalidates the snapshot.
+        os.unlink(os.path.join(self.env_dir, "HOSTNAME"))
+        config = self.make_config({}).snapshot(self.snapshot)
+        self.assertEqual(config("HOSTNAME"), "filehost")
+
+    def test_corrupt(self):
+        config = self.make_config({})
+        self.resolve(config)
+        with mock.patch("cconf.cli.importlib.import_module") as import_module:
+            import_module.return_value.config = config
+            main("-q", "compile", "-o", self.snapshot)
+        with open(self.snapshot, "r+b") as f:
+            f.seek(-2, os.SEEK_END)
+            f.write(b"!}")
+        with self.assertWarns(ConfigWarning):
+            config = self.make_config({}).snapshot(self.snapshot)
+        self.assertIsNone(config._snapshot)
+        self.assertEqual(config("PORT"), "8080")
+        # Missing snapshots are silently ignored.
+        config.snapshot(self.snapshot + ".missing")
+        self.assertIsNone(config._snapshot)
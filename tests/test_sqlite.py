@@ -0,0 +1,96 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from cryptography.fernet import Fernet
+
+from cconf import Config, EnvFile, SqliteSource
+from cconf.cli import main
+from cconf.sqlite import write_sqlite
+
+
+class SqliteSourceTests(unittest.TestCase):
+    def test_lookup(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            database = os.path.join(dirname, "config.db")
+            write_sqlite(database, {"HOSTNAME": "example.com", "PORT": "8080"})
+            config = Config(SqliteSource(database))
+            self.assertEqual(config("HOSTNAME"), "example.com")
+            self.assertEqual(config("PORT", cast=int), 8080)
+            with self.assertRaises(KeyError):
+                config("MISSING")
+            # Updates are seen by readers with open connections.
+            write_sqlite(database, {"PORT": "9090"})
+            self.assertEqual(config("PORT", cast=int), 9090)
+            self.assertEqual(config("HOSTNAME"), "example.com")
+            conn = sqlite3.connect(database)
+            mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            conn.close()
+            self.assertEqual(mode, "wal")
+
+    def test_threads(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            database = os.path.join(dirname, "config.db")
+            write_sqlite(database, {f"KEY_{i}": str(i) for i in range(100)})
+            source = SqliteSource(database)
+            connections = set()
+            errors = []
+            # Keep every thread (and its connection) alive until all have connected.
+            barrier = threading.Barrier(8)
+
+            def read():
+                try:
+                    for i in range(100):
+                        self.assertEqual(source[f"KEY_{i}"], str(i))
+                    connections.add(id(source._connection()))
+                except Exception as ex:
+                    errors.append(ex)
+                barrier.wait()
+
+            threads = [threading.Thread(target=read) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual(errors, [])
+            self.assertEqual(len(connections), 8)
+
+    def test_read_only(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            database = os.path.join(dirname, "config.db")
+            source = SqliteSource(database)
+            with self.assertRaises(KeyError):
+                source["HOSTNAME"]
+            self.assertFalse(os.path.exists(database))
+            write_sqlite(database, {"HOSTNAME": "example.com"})
+            with self.assertRaises(sqlite3.OperationalError):
+                source._connection().execute("DELETE FROM config")
+
+    def test_cli(self):
+        key = Fernet.generate_key()
+        token = Fernet(key).encrypt(b"hunter2").decode()
+        with tempfile.TemporaryDirectory() as dirname:
+            env_file = os.path.join(dirname, "env")
+            with open(env_file, "w") as f:
+                f.write(f"HOSTNAME=example.com\nPASSWORD={token}\n")
+            imported = os.path.join(dirname, "imported.db")
+            main("-q", "sqlite", "-o", imported, env_file)
+            config = Config(SqliteSource(imported, keys=[key]))
+            self.assertEqual(config("PASSWORD", sensitive=True), "hunter2")
+            # Exporting a config keeps sensitive values encrypted.
+            config = Config(EnvFile(env_file, keys=[key]))
+            config("HOSTNAME")
+            config("PASSWORD", sensitive=True)
+            config("DEBUG", "false")
+            exported = os.path.join(dirname, "exported.db")
+            with mock.patch("cconf.cli.importlib.import_module") as import_module:
+                import_module.return_value.config = config
+                main("-q", "sqlite", "-o", exported, "-t", "settings")
+            source = SqliteSource(exported, table="settings")
+            self.assertEqual(source["PASSWORD"], token)
+            self.assertEqual(source["HOSTNAME"], "example.com")
+            with self.assertRaises(KeyError):
+                source["DEBUG"]
@@ -0,0 +1,155 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from cconf import (
+    Config,
+    ConfigError,
+    DatabaseDict,
+    JsonSource,
+    TomlSource,
+    YamlSource,
+)
+from cconf.snapshot import Snapshot
+from cconf.structured import load_toml
+
+TOML = """
+debug = true
+
+[database]
+engine = "django.db.backends.postgresql"
+name = "app"
+port = 5432
+
+[database.replica]
+host = "replica.example.com"
+"""
+
+YAML = """
+debug: true
+hosts: [a.example.com, b.example.com]
+database:
+  replica:
+    host: replica.example.com
+"""
+
+
+class StructuredSourceTests(unittest.TestCase):
+    def write(self, dirname: str, name: str, contents: str) -> str:
+        path = os.path.join(dirname, name)
+        with open(path, "w") as f:
+            f.write(contents)
+        return path
+
+    def test_toml(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            config = Config(TomlSource(self.write(dirname, "config.toml", TOML)))
+            self.assertEqual(config("database.replica.host"), "replica.example.com")
+            self.assertEqual(config("database__replica__host"), "replica.example.com")
+            self.assertEqual(config("database.port", cast=int), 5432)
+            self.assertIs(config("debug", cast=bool), True)
+            self.assertEqual(
+                config("database", cast=DatabaseDict(CONN_MAX_AGE=60)),
+                {
+                    "engine": "django.db.backends.postgresql",
+                    "name": "app",
+                    "port": 5432,
+                    "replica": {"host": "replica.example.com"},
+                    "CONN_MAX_AGE": 60,
+                },
+            )
+            with self.assertRaises(KeyError):
+                config("database.missing")
+            self.assertEqual(
+                config.prefixed("database.replica."),
+                {"database.replica.host": "replica.example.com"},
+            )
+
+    def test_copies(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            path = self.write(dirname, "config.toml", TOML)
+            source = TomlSource(path)
+            # Changing a returned table (or anything in it) doesn't change the source,
+            # or other sources reading the same file.
+            database = Config(source)("database", cast=None)
+            database["name"] = "mutated"
+            database["replica"]["host"] = "mutated"
+            for config in (Config(source), Config(TomlSource(path))):
+                self.assertEqual(config("database", cast=None)["name"], "app")
+                self.assertEqual(
+                    config("database", cast=DatabaseDict(CONN_MAX_AGE=60))["replica"][
+                        "host"
+                    ],
+                    "replica.example.com",
+                )
+                self.assertEqual(config("database.name"), "app")
+
+    def test_snapshot(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            path = self.write(dirname, "config.toml", "released = 2024-01-01\n" + TOML)
+            config = Config(TomlSource(path))
+            config("database", cast=None)
+            config("released", cast=None)
+            # Structured sources are always read live, so never compiled.
+            snapshot = os.path.join(dirname, "config.snapshot")
+            Snapshot.compile(config).write(snapshot)
+            config.snapshot(snapshot)
+            database = config("database", cast=None)
+            database["name"] = "mutated"
+            self.assertEqual(config("database", cast=None)["name"], "app")
+
+    def test_json(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            path = self.write(
+                dirname, "config.json", json.dumps({"cache": {"timeout": 30}})
+            )
+            source = JsonSource(path, separators=["/"])
+            self.assertEqual(source["cache/timeout"], 30)
+            self.assertEqual(source["cache"], {"timeout": 30})
+            self.assertEqual(list(source.keys()), ["cache/timeout"])
+            with self.assertRaises(KeyError):
+                source["cache.timeout"]
+
+    def test_yaml(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            source = YamlSource(self.write(dirname, "config.yaml", YAML))
+            self.assertEqual(source["hosts"], ["a.example.com", "b.example.com"])
+            self.assertEqual(source["database.replica.host"], "replica.example.com")
+            self.assertEqual(
+                sorted(source.keys()), ["database.replica.host", "debug", "hosts"]
+            )
+
+    def test_errors(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            source = JsonSource(self.write(dirname, "list.json", "[1, 2]"))
+            with self.assertRaises(ConfigError):
+                source["key"]
+            source = TomlSource(self.write(dirname, "bad.toml", "key = "))
+            with self.assertRaises(ConfigError):
+                source["key"]
+            # Missing files are treated as having no keys.
+            source = TomlSource(os.path.join(dirname, "missing.toml"))
+            with self.assertRaises(KeyError):
+                source["key"]
+            self.assertEqual(list(source.keys()), [])
+
+    def test_parsed_once(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            path = self.write(dirname, "config.toml", TOML)
+            past = time.time() - 60
+            os.utime(path, (past, past))
+            with mock.patch.object(TomlSource, "parse", wraps=load_toml) as parse:
+                first, second = TomlSource(path), TomlSource(path)
+                self.assertEqual(first["database.name"], "app")
+                self.assertEqual(second["database.name"], "app")
+                self.assertEqual(parse.call_count, 1)
+                # Reloading a changed file parses it again.
+                with open(path, "a") as f:
+                    f.write("extra = 1\n")
+                os.utime(path, (past + 1, past + 1))
+                first.reload()
+                self.assertEqual(first["database.replica.extra"], 1)
+                self.assertEqual(parse.call_count, 2)